@@ -0,0 +1,122 @@
+# Phân tích hàng loạt thế cờ: nhận một luồng FEN, chia thành từng lô cho các tiến trình
+# con (mỗi tiến trình giữ một Board dùng lại), trả kết quả về theo đúng thứ tự đầu vào.
+#
+#   python batch.py positions.fen --workers 8 --depth 3 > results.jsonl
+import argparse
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from chessboard import Board
+from pieces import COLOR_BITS
+from search import Searcher
+from transposition import TranspositionTable
+
+# Trạng thái riêng của từng tiến trình con, tạo một lần trong _init_worker
+_board = None
+_tt = None
+
+
+def analyse(board, fen, depth=None, movetime=None, tt=None):
+    """Phân tích một thế cờ: số nước đi hợp lệ, trạng thái chiếu/chiếu hết/hết nước
+    và (nếu có depth hoặc movetime) kết quả tìm kiếm. FEN hỏng cho kết quả {'fen', 'error'}
+    thay vì dừng cả luồng phân tích."""
+    try:
+        return _analyse(board, fen, depth, movetime, tt)
+    except Exception as exc:
+        return {'fen': fen, 'error': f'{type(exc).__name__}: {exc}'}
+
+
+def _analyse(board, fen, depth, movetime, tt):
+    board.show(fen)
+    color = board.player_turn
+    moves = board._legal_moves(COLOR_BITS[color])
+    in_check = board.king_in_check(color)
+    if not moves:
+        status = 'checkmate' if in_check else 'stalemate'
+    else:
+        status = 'check' if in_check else 'normal'
+    result = {'fen': fen, 'legal_moves': len(moves), 'status': status}
+    if moves and (depth or movetime):
+        found = Searcher(board, tt=tt).search(depth=depth or 64, movetime=movetime)
+        result['best_move'] = ''.join(found.move).lower() if found.move else None
+        result['score'] = found.score
+        result['depth'] = found.depth
+        result['pv'] = [''.join(move).lower() for move in found.pv]
+    return result
+
+
+def _init_worker():
+    global _board, _tt
+    _board = Board()
+    _tt = TranspositionTable(1 << 16)
+
+
+def _analyse_chunk(fens, depth, movetime):
+    if _board is None:
+        _init_worker()
+    return [analyse(_board, fen, depth, movetime, _tt) for fen in fens]
+
+
+def _chunks(fens, size):
+    iterator = iter(fens)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyse_fens(fens, workers=None, chunk_size=64, depth=None, movetime=None):
+    """Phân tích một luồng FEN song song trên nhiều tiến trình, trả về (generator) các kết quả
+    theo thứ tự đầu vào. Chỉ giữ một số lô giới hạn đang xử lý nên luồng vào có thể rất lớn.
+    workers=1 chạy ngay trong tiến trình hiện tại."""
+    if workers == 1:
+        for chunk in _chunks(fens, chunk_size):
+            yield from _analyse_chunk(chunk, depth, movetime)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        in_flight = deque()
+        limit = (workers or os.cpu_count() or 1) * 2  # Đủ để các tiến trình không phải chờ lô mới
+        for chunk in _chunks(fens, chunk_size):
+            in_flight.append(executor.submit(_analyse_chunk, chunk, depth, movetime))
+            if len(in_flight) >= limit:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def read_fens(stream):
+    """Đọc FEN từ từng dòng, bỏ qua dòng trống và dòng chú thích (#)."""
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyse a stream of FEN positions in parallel.')
+    parser.add_argument('input', nargs='?', help='file with one FEN per line (default: stdin)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=64, help='positions per task')
+    parser.add_argument('--depth', type=int, help='search each position to this depth')
+    parser.add_argument('--movetime', type=float, help='search each position for this many seconds')
+    args = parser.parse_args(argv)
+
+    stream = open(args.input) if args.input else sys.stdin
+    try:
+        for result in analyse_fens(read_fens(stream), args.workers, args.chunk_size,
+                                   args.depth, args.movetime):
+            sys.stdout.write(json.dumps(result) + '\n')
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
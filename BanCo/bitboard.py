@@ -0,0 +1,197 @@
+# Bộ sinh nước đi dùng bitboard: mỗi loại quân của mỗi màu là một số nguyên 64 bit,
+# bit thứ hàng * 8 + cột bật khi ô đó có quân. Các bảng tấn công của mã, vua và tốt
+# được tính sẵn một lần; quân trượt (xe, tượng, hậu) dùng phương pháp tia cổ điển.
+from pieces import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK, COLOR_BITS, LETTER_OF, PROMOTIONS
+from squares import FILES, SQUARES
+
+FULL = (1 << 64) - 1
+RANK_3 = 0xFF << 16
+RANK_6 = 0xFF << 40
+LAST_RANK = (0xFF << 56, 0xFF)  # Hàng phong cấp của tốt trắng, tốt đen
+
+# Tên ô theo chỉ số 0..63
+SQUARE_NAMES_64 = [FILES[sq & 7] + str((sq >> 3) + 1) for sq in range(64)]
+
+
+def to_64(sq):
+    """Chuyển chỉ số 0x88 sang chỉ số 0..63."""
+    return (sq + (sq & 7)) >> 1
+
+
+def to_0x88(sq):
+    """Chuyển chỉ số 0..63 sang chỉ số 0x88."""
+    return sq + (sq & ~7)
+
+
+def _jump_table(offsets):
+    """Tính bảng tấn công của quân nhảy một bước (mã, vua, tốt) cho từng ô."""
+    table = []
+    for sq in range(64):
+        row, col = sq >> 3, sq & 7
+        bb = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                bb |= 1 << (r * 8 + c)
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _jump_table(((2, 1), (2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2), (-2, 1), (-2, -1)))
+KING_ATTACKS = _jump_table(((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)))
+PAWN_ATTACKS = (_jump_table(((1, -1), (1, 1))), _jump_table(((-1, -1), (-1, 1))))  # Trắng, đen
+
+# Các hướng trượt (hàng, cột); hướng "dương" làm chỉ số ô tăng dần
+ORTHOGONAL_DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+DIAGONAL_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def _ray_table(dr, dc):
+    table = []
+    for sq in range(64):
+        r, c = (sq >> 3) + dr, (sq & 7) + dc
+        bb = 0
+        while 0 <= r < 8 and 0 <= c < 8:
+            bb |= 1 << (r * 8 + c)
+            r, c = r + dr, c + dc
+        table.append(bb)
+    return table
+
+
+# Mỗi phần tử: (bảng tia, hướng dương hay không)
+ORTHOGONAL_RAYS = tuple((_ray_table(dr, dc), dr * 8 + dc > 0) for dr, dc in ORTHOGONAL_DIRECTIONS)
+DIAGONAL_RAYS = tuple((_ray_table(dr, dc), dr * 8 + dc > 0) for dr, dc in DIAGONAL_DIRECTIONS)
+
+
+def sliding_attacks(sq, occupancy, rays):
+    """Các ô bị quân trượt tại sq tấn công, dừng ở quân cản đầu tiên trên mỗi tia."""
+    attacks = 0
+    for table, positive in rays:
+        ray = table[sq]
+        blockers = ray & occupancy
+        if blockers:
+            # Quân cản gần nhất: bit thấp nhất với hướng dương, bit cao nhất với hướng âm
+            first = (blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1
+            ray ^= table[first]
+        attacks |= ray
+    return attacks
+
+
+def iter_bits(bb):
+    """Duyệt chỉ số các bit đang bật của bitboard."""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+class Bitboards:
+    """Ảnh chụp bitboard của một bàn cờ, dựng lại từ mảng 0x88 mỗi lần tạo. Dùng để đối chiếu
+    với bộ sinh nước đi 0x88 (perft --engine bitboard), không nằm trên đường nóng của tìm kiếm
+    nên Board không phải trả chi phí giữ bitboard trong _put."""
+
+    def __init__(self, board):
+        self.pieces = [0] * 16  # Bitboard theo mã quân cờ
+        self.occupancy = [0, 0]  # Trắng, đen
+        self.castling = board.castling
+        self.en_passant = to_64(board.ep_square) if board.ep_square is not None else None
+        squares = board.squares
+        for sq in SQUARES:
+            code = squares[sq]
+            if code:
+                bit = 1 << to_64(sq)
+                self.pieces[code] |= bit
+                self.occupancy[code >> 3] |= bit
+
+    def attacks_from(self, code, sq, occupancy):
+        """Các ô bị quân mang mã code tại ô sq (0..63) tấn công."""
+        kind = code & 7
+        if kind == KNIGHT:
+            return KNIGHT_ATTACKS[sq]
+        if kind == KING:
+            return KING_ATTACKS[sq]
+        if kind == PAWN:
+            return PAWN_ATTACKS[code >> 3][sq]
+        attacks = 0
+        if kind != BISHOP:
+            attacks |= sliding_attacks(sq, occupancy, ORTHOGONAL_RAYS)
+        if kind != ROOK:
+            attacks |= sliding_attacks(sq, occupancy, DIAGONAL_RAYS)
+        return attacks
+
+    def attacked(self, sq, bit):
+        """Ô sq (0..63) có bị quân màu bit tấn công không."""
+        pieces = self.pieces
+        if PAWN_ATTACKS[(bit >> 3) ^ 1][sq] & pieces[PAWN | bit]:
+            return True  # Tốt tấn công sq nằm ở các ô mà tốt màu kia đứng tại sq tấn công
+        if KNIGHT_ATTACKS[sq] & pieces[KNIGHT | bit] or KING_ATTACKS[sq] & pieces[KING | bit]:
+            return True
+        occupancy = self.occupancy[0] | self.occupancy[1]
+        queens = pieces[QUEEN | bit]
+        if sliding_attacks(sq, occupancy, ORTHOGONAL_RAYS) & (pieces[ROOK | bit] | queens):
+            return True
+        return bool(sliding_attacks(sq, occupancy, DIAGONAL_RAYS) & (pieces[BISHOP | bit] | queens))
+
+    def moves(self, bit):
+        """Sinh các nước đi giả hợp lệ (từ, đến, phong cấp) theo chỉ số 0..63 của màu có bit màu là bit."""
+        side = bit >> 3
+        own, enemy = self.occupancy[side], self.occupancy[side ^ 1]
+        occupancy = own | enemy
+        empty = ~occupancy & FULL
+        pieces = self.pieces
+
+        # Tốt: đi thẳng một hoặc hai ô và ăn chéo
+        pawns = pieces[PAWN | bit]
+        if bit == BLACK:
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_6) >> 8) & empty
+            step = -8
+        else:
+            single = (pawns << 8) & empty
+            double = ((single & RANK_3) << 8) & empty
+            step = 8
+        last = LAST_RANK[side]
+        for to in iter_bits(single & ~last):
+            yield to - step, to, 0
+        for to in iter_bits(single & last):
+            for promotion in PROMOTIONS:
+                yield to - step, to, promotion
+        for to in iter_bits(double):
+            yield to - 2 * step, to, 0
+        for frm in iter_bits(pawns):
+            for to in iter_bits(PAWN_ATTACKS[side][frm] & enemy):
+                if 1 << to & last:
+                    for promotion in PROMOTIONS:
+                        yield frm, to, promotion
+                else:
+                    yield frm, to, 0
+        if self.en_passant is not None and self.en_passant >> 3 == (2 if bit else 5):
+            # Ô bắt tốt qua đường chỉ dành cho bên đang đi: hàng 6 với trắng, hàng 3 với đen.
+            # Các tốt đứng ở ô mà tốt đối phương tại ô bắt tốt qua đường tấn công
+            for frm in iter_bits(PAWN_ATTACKS[side ^ 1][self.en_passant] & pawns):
+                yield frm, self.en_passant, 0
+
+        # Các quân còn lại: tấn công trừ đi các ô có quân cùng màu
+        for kind in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            code = kind | bit
+            for frm in iter_bits(pieces[code]):
+                for to in iter_bits(self.attacks_from(code, frm, occupancy) & ~own):
+                    yield frm, to, 0
+
+        # Nhập thành: vua và xe ở chỗ ban đầu, các ô giữa trống, vua không đi qua ô bị tấn công
+        rights = (self.castling >> (bit >> 2)) & 3
+        king = 60 if bit else 4
+        if rights and pieces[KING | bit] >> king & 1 and not self.attacked(king, bit ^ BLACK):
+            rooks = pieces[ROOK | bit]
+            if rights & 1 and not occupancy & (3 << king + 1) and rooks >> (king + 3) & 1 \
+                    and not self.attacked(king + 1, bit ^ BLACK):
+                yield king, king + 2, 0
+            if rights & 2 and not occupancy & (7 << king - 3) and rooks >> (king - 4) & 1 \
+                    and not self.attacked(king - 1, bit ^ BLACK):
+                yield king, king - 2, 0
+
+    def generate_moves(self, color):
+        """Trả về các nước đi giả hợp lệ của một màu dạng ('E2', 'E4') hoặc ('E7', 'E8', 'Q')."""
+        names = SQUARE_NAMES_64
+        return [(names[frm], names[to], LETTER_OF[promotion]) if promotion else (names[frm], names[to])
+                for frm, to, promotion in self.moves(COLOR_BITS[color])]
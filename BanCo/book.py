@@ -0,0 +1,156 @@
+# Sách khai cuộc: bộ dựng đọc các ván cờ (PGN hoặc danh sách nước đi SAN) và ghi ra một
+# bảng đã sắp xếp theo khóa Zobrist của thế cờ; bộ đọc ánh xạ tệp vào bộ nhớ bằng mmap
+# và tìm nước đi bằng tìm kiếm nhị phân, không nạp cả tệp vào RAM.
+#
+# Mỗi bản ghi ENTRY_SIZE byte: khóa (8 byte) | nước đi mã hóa (2 byte) | trọng số (2 byte).
+#
+#   python book.py build games.pgn book.bin --max-ply 20
+#   python book.py probe book.bin "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+from collections import Counter
+
+import pgn
+from chessboard import Board, InvalidMove, move_names
+from codec import decode_move, encode_move
+from pieces import COLOR_BITS
+
+ENTRY = struct.Struct('>QHH')
+ENTRY_SIZE = ENTRY.size
+MAX_WEIGHT = 0xFFFF
+
+
+def _game_moves(game):
+    """Thế cờ bắt đầu và các nước SAN của một ván (pgn.Game hoặc danh sách SAN)."""
+    if hasattr(game, 'iter_moves'):
+        return game.headers.get('FEN', pgn.STANDARD_START), game.iter_moves()
+    return pgn.STANDARD_START, iter(game)
+
+
+def collect(games, max_ply=20, board=None):
+    """Đếm số lần mỗi (khóa thế cờ, nước đi) xuất hiện trong max_ply nửa nước đầu của các ván."""
+    board = board if board is not None else Board()
+    counts = Counter()
+    for game in games:
+        start, moves = _game_moves(game)
+        board.show(start)
+        for ply, san in enumerate(moves):
+            if ply >= max_ply:
+                break
+            try:
+                move = board._parse_san(san)
+            except InvalidMove:
+                break  # Nước đi không đọc được: bỏ phần còn lại của ván
+            counts[board.zobrist_key, encode_move(*move)] += 1
+            board._make(*move)
+    return counts
+
+
+def write_book(counts, path, min_count=1):
+    """Ghi bảng sách khai cuộc đã sắp xếp (theo khóa, rồi trọng số giảm dần); trả về số bản ghi."""
+    entries = sorted(((key, -count, move) for (key, move), count in counts.items() if count >= min_count))
+    with open(path, 'wb') as f:
+        for key, count, move in entries:
+            f.write(ENTRY.pack(key, move, min(-count, MAX_WEIGHT)))
+    return len(entries)
+
+
+def build_book(games, path, max_ply=20, min_count=1):
+    """Dựng sách khai cuộc từ các ván cờ và ghi ra tệp path."""
+    return write_book(collect(games, max_ply), path, min_count)
+
+
+class OpeningBook:
+    """Đọc sách khai cuộc bằng mmap; mỗi lần tra cứu chỉ chạm tới O(log n) bản ghi."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        size = os.path.getsize(path)
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.size = size // ENTRY_SIZE
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def entries(self, key):
+        """Các cặp (nước đi mã hóa, trọng số) của thế cờ có khóa key."""
+        data = self._data
+        lo, hi = 0, self.size
+        while lo < hi:  # Tìm bản ghi đầu tiên có khóa >= key
+            mid = (lo + hi) // 2
+            if ENTRY.unpack_from(data, mid * ENTRY_SIZE)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        result = []
+        while lo < self.size:
+            entry_key, move, weight = ENTRY.unpack_from(data, lo * ENTRY_SIZE)
+            if entry_key != key:
+                break
+            result.append((move, weight))
+            lo += 1
+        return result
+
+    def moves(self, board):
+        """Các nước đi trong sách cho thế cờ của board: danh sách (('E2', 'E4'), trọng số).
+        Nước đi được đối chiếu với các nước hợp lệ để loại bỏ trùng khóa ngẫu nhiên."""
+        entries = self.entries(board.zobrist_key)
+        if not entries:
+            return []
+        legal = set(board._legal_moves(COLOR_BITS[board.player_turn]))
+        result = []
+        for move, weight in entries:
+            move = decode_move(move)
+            if move in legal:
+                result.append((move_names(move), weight))
+        return result
+
+    def choose(self, board, rng=random):
+        """Chọn ngẫu nhiên một nước trong sách theo trọng số, hoặc None nếu hết sách."""
+        moves = self.moves(board)
+        if not moves:
+            return None
+        return rng.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or probe an opening book.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='compile PGN games into a book file')
+    build.add_argument('pgn')
+    build.add_argument('book')
+    build.add_argument('--max-ply', type=int, default=20)
+    build.add_argument('--min-count', type=int, default=1)
+    probe = commands.add_parser('probe', help='list book moves for a position')
+    probe.add_argument('book')
+    probe.add_argument('fen', nargs='?', default=pgn.STANDARD_START)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        with open(args.pgn) as f:
+            count = build_book(pgn.read_games(f), args.book, args.max_ply, args.min_count)
+        print(f'{count} entries written to {args.book}')
+    else:
+        with OpeningBook(args.book) as book:
+            for move, weight in book.moves(Board(args.fen)):
+                print(f"{''.join(move).lower()} {weight}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,191 +1,657 @@
-import pieces
-import re
-from copy import deepcopy
-# Định dạng ban đầu của bàn cờ (FEN notation)
-START_PATTERN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR 0 0 1'
-
-# Các ngoại lệ tùy chỉnh
-class ChessError(Exception): pass
-class Check(ChessError): pass
-class InvalidMove(ChessError): pass
-class CheckMate(ChessError): pass
-class Draw(ChessError): pass
-class NotYourTurn(ChessError): pass
-
-# Lớp Bàn cờ
-class Board(dict):
-    # Trục x và y của bàn cờ
-    y_axis = ('A', 'B', 'C', 'D', 'E', 'F', 'G', 'H')  
-    x_axis = (1, 2, 3, 4, 5, 6, 7, 8)  
-
-    # Các thuộc tính về trạng thái của trò chơi
-    captured_pieces = {'white': [], 'black': []}
-    player_turn = None  # Lượt đi của người chơi
-    halfmove_clock = 0  # Đồng hồ nửa nước
-    fullmove_number = 1  # Số lần đi đầy đủ
-    history = []  # Lịch sử các nước đi
-
-    def __init__(self, patt=None):  
-        self.process_notation(START_PATTERN)  # Khởi tạo bàn cờ từ FEN notation
-
-    # Phương thức xử lý và thiết lập trạng thái bàn cờ từ FEN notation
-    def process_notation(self, patt):  
-        """Xử lý FEN notation và thiết lập bàn cờ.""" 
-        self.clear()  # Xóa bàn cờ hiện tại
-        rows = patt.split('/')  # Tách các hàng trên bàn cờ
-
-        # Hàm mở rộng các khoảng trắng theo số lượng
-        def expand_whitespaces(match):  
-            return ' ' * int(match.group(0))  
-
-        # Mở rộng các ký tự số thành khoảng trắng
-        expanded_rows = [re.sub(r'\d', expand_whitespaces, row) for row in rows[:8]]  
-
-        # Đặt các quân cờ lên bàn theo FEN notation
-        for x, row in enumerate(expanded_rows):  
-            for y, alphabet in enumerate(row):  
-                if alphabet == ' ':  
-                    continue  
-                xycoord = self.alpha_notation((7 - x, y))  # Chuyển đổi tọa độ từ số sang ký tự
-                self[xycoord] = pieces.create_piece(alphabet)  # Tạo quân cờ
-                if self[xycoord] is not None:
-                    self[xycoord].ref(self)  # Tham chiếu quân cờ vào bàn cờ
-
-        # Thiết lập lượt đi của người chơi
-        self.player_turn = 'white' if patt.split()[1] == 'w' else 'black'
-
-    # Kiểm tra tọa độ có nằm trên bàn cờ không
-    def is_on_board(self, coord):  
-        return 0 <= coord[0] < 8 and 0 <= coord[1] < 8 
-        
-    # Chuyển đổi tọa độ số thành ký tự (ví dụ: (7, 0) -> 'A1')
-    def alpha_notation(self, xycoord):  
-        if not self.is_on_board(xycoord):  
-            return  
-        return self.y_axis[xycoord[1]] + str(self.x_axis[xycoord[0]])  
-
-    # Chuyển đổi tọa độ ký tự thành tọa độ số (ví dụ: 'A1' -> (7, 0))
-    def num_notation(self, xycoord):  
-        return int(xycoord[1]) - 1, self.y_axis.index(xycoord[0])  
-
-    # Các phương thức xử lý quân cờ và nước đi
-    def occupied(self, color):  
-        return [coord for coord in self if self[coord].color == color]  # Các quân cờ của một màu
-
-    def all_moves_available(self, color):
-        result = []  
-        # Duyệt qua tất cả các quân cờ của người chơi
-        for coord in self.keys():  
-            if self[coord] is not None and self[coord].color == color:  
-                moves = self[coord].moves_available(coord)  # Lấy các nước đi hợp lệ
-                if moves:  
-                    result += moves  
-        return result
-
-    def position_of_king(self, color):
-        # Tìm vị trí của quân vua
-        for pos in self.keys():  
-            if isinstance(self[pos], pieces.King) and self[pos].color == color:  
-                return pos
-
-    def king_in_check(self, color):
-        # Kiểm tra xem vua có bị chiếu không
-        king_pos = self.position_of_king(color)  
-        opponent = 'black' if color == 'white' else 'white'  
-        for piece in self.values():  
-            if isinstance(piece, pieces.Piece) and king_pos in self.all_moves_available(opponent):  
-                return True  
-        return False
-
-    def is_in_check_after_move(self, p1, p2):
-        # Kiểm tra nếu quân cờ di chuyển có khiến vua bị chiếu hay không
-        temp_board = deepcopy(self)  # Tạo bản sao bàn cờ
-        temp_board.move(p1, p2)  # Di chuyển quân cờ
-        return temp_board.king_in_check(self[p1].color)  # Kiểm tra vua có bị chiếu không
-
-    def shift(self, p1, p2):
-        p1, p2 = p1.upper(), p2.upper()  # Chuyển về chữ hoa để thống nhất
-        piece = self[p1]  
-        try:  
-            dest = self[p2]  # Lấy quân cờ đích
-        except KeyError:  
-            dest = None  
-
-        if self.player_turn != piece.color:  
-            raise NotYourTurn(f"Not {piece.color}'s turn!")  # Kiểm tra lượt đi của người chơi
-
-        enemy = 'white' if piece.color == 'black' else 'black'  
-        moves_available = piece.moves_available(p1)  # Lấy các nước đi hợp lệ của quân cờ
-
-        if p2 not in moves_available:  
-            raise InvalidMove("Invalid move")  # Nước đi không hợp lệ
-
-        if self.all_moves_available(enemy) and self.is_in_check_after_move(p1, p2):  
-            raise Check("Move leaves king in check")  # Nước đi khiến vua bị chiếu
-
-        if not moves_available and self.king_in_check(piece.color):  
-            raise CheckMate("Player's king is in checkmate")  # Nếu không có nước đi và vua bị chiếu, thua
-
-        elif not moves_available:  
-            raise Draw("Stalemate: No valid moves available")  # Hòa vì không có nước đi hợp lệ
-
-
-        else:  
-            self.move(p1, p2)  # Di chuyển quân cờ
-            self.complete_move(piece, dest, p1, p2)  # Hoàn tất nước đi
-
-        
-
-        
-    def move(self, p1, p2):
-        # Di chuyển quân cờ từ p1 đến p2
-        piece = self[p1]  
-        try:  
-            dest = self[p2]  # Lấy quân cờ đích
-        except KeyError:  
-            dest = None  
-        del self[p1]  # Xóa quân cờ tại p1
-        self[p2] = piece  # Đặt quân cờ tại p2
-
-    def complete_move(self, piece, dest, p1, p2):
-        # Hoàn tất quá trình nước đi
-        enemy = 'white' if piece.color == 'black' else 'black'  
-        if piece.color == 'black':  
-            self.fullmove_number += 1  # Tăng số lần đi đầy đủ
-        self.halfmove_clock += 1  # Tăng đồng hồ nước rưỡi
-        self.player_turn = enemy  # Chuyển lượt người chơi
-
-        abbr = piece.shortname  # Lấy ký tự viết tắt của quân cờ
-        if abbr == 'P':  
-            abbr = ''  # Nếu là tốt thì không ghi chữ 'P'
-            self.halfmove_clock = 0  # Reset đồng hồ nếu là tốt
-
-        movetext = abbr + ('x' if dest else '') + p2.lower()  # Ghi lại nước đi
-        if dest is None:  
-            self.halfmove_clock = 0  # Reset đồng hồ nếu không có quân bị ăn
-        self.history.append(movetext)  # Thêm vào lịch sử các nước đi
-
-    # Hiển thị trạng thái bàn cờ
-    def show(self, pat):
-        self.clear()  # Xóa bàn cờ hiện tại
-        pat = pat.split(' ')  # Tách FEN notation ra
-
-        # Hàm mở rộng khoảng trắng
-        def expand(match): return ' ' * int(match.group(0))
-        pat[0] = re.compile(r'\d').sub(expand, pat[0])
-
-        # Đặt các quân cờ lên bàn cờ từ FEN notation
-        for x, row in enumerate(pat[0].split('/')):
-            for y, letter in enumerate(row):
-                if letter == ' ':
-                    continue
-                coord = self.alpha_notation((7 - x, y))  # Chuyển đổi tọa độ từ số sang ký tự
-                self[coord] = pieces.create_piece(letter)  # Tạo quân cờ
-                self[coord].place(self)  # Đặt quân cờ lên bàn
-
-        # Thiết lập lại các thông số trò chơi
-        self.player_turn = 'white' if pat[1] == 'w' else 'black'
-        self.halfmove_clock = int(pat[2])
-        self.fullmove_number = int(pat[3])
-
-        
+import bitboard
+import evaluation
+import pieces
+import re
+import zobrist
+from collections.abc import MutableMapping
+from pieces import (BISHOP, BLACK, CASTLING_LETTERS, COLOR_BITS, COLOR_NAMES, CODE_OF, KING, KING_HOME,
+                    KNIGHT, LETTER_OF, PAWN, PROMOTIONS, QUEEN, ROOK)
+from squares import DIAGONAL, KNIGHT_OFFSETS, ORTHOGONAL, SQUARES, SQUARE_INDEX, SQUARE_NAMES
+# Định dạng ban đầu của bàn cờ (FEN notation)
+START_PATTERN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Quyền nhập thành còn lại sau khi có quân đi từ hoặc tới một ô: vua hoặc xe rời chỗ, xe bị ăn
+CASTLING_MASK = [15] * 128
+for _sq, _lost in ((0x04, 3), (0x07, 1), (0x00, 2), (0x74, 12), (0x77, 4), (0x70, 8)):
+    CASTLING_MASK[_sq] = 15 ^ _lost
+del _sq, _lost
+
+
+def move_names(move):
+    """Đổi nước đi (từ, đến, phong cấp) theo chỉ số 0x88 thành ('E2', 'E4') hoặc ('E7', 'E8', 'Q')."""
+    frm, to, promotion = move
+    if promotion:
+        return SQUARE_NAMES[frm], SQUARE_NAMES[to], LETTER_OF[promotion]
+    return SQUARE_NAMES[frm], SQUARE_NAMES[to]
+
+
+# Các ngoại lệ tùy chỉnh
+class ChessError(Exception): pass
+class Check(ChessError): pass
+class InvalidMove(ChessError): pass
+class CheckMate(ChessError): pass
+class Draw(ChessError): pass
+class NotYourTurn(ChessError): pass
+
+# Lớp Bàn cờ
+# Trạng thái bàn cờ nằm trong một mảng 0x88 (bytearray 128 phần tử) chứa mã quân cờ;
+# giao diện dạng dict (board['E4'], items(), get, ...) chỉ là lớp chuyển đổi bên ngoài.
+class Board(MutableMapping):
+    # Trục x và y của bàn cờ
+    y_axis = ('A', 'B', 'C', 'D', 'E', 'F', 'G', 'H')  
+    x_axis = (1, 2, 3, 4, 5, 6, 7, 8)  
+
+    # Các thuộc tính về trạng thái của trò chơi
+    player_turn = None  # Lượt đi của người chơi
+    halfmove_clock = 0  # Đồng hồ nửa nước
+    fullmove_number = 1  # Số lần đi đầy đủ
+    castling = 0  # Quyền nhập thành còn lại (4 bit theo thứ tự KQkq)
+    ep_square = None  # Ô bắt tốt qua đường (chỉ số 0x88), chỉ đặt khi bên đang đi bắt được
+
+    # Ký hiệu đại số chuẩn (SAN) của một nước đi, ví dụ 'Nbd7', 'exd5', 'Qh4+', 'e8=Q'
+    SAN_PATTERN = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+
+    def __init__(self, patt=None):  
+        self.captured_pieces = {'white': [], 'black': []}
+        self.history = []  # Lịch sử các nước đi (SAN) của riêng bàn cờ này
+        self.squares = bytearray(128)  # Mảng 0x88 chứa mã quân cờ, 0 là ô trống
+        self._undo = []  # Ngăn xếp thông tin hoàn tác của make_move
+        self._keys = []  # Khóa Zobrist của các thế cờ trước mỗi nước trong _undo (để phát hiện lặp lại)
+        self._kings = [None, None]  # Vị trí vua trắng, vua đen (chỉ số 0x88)
+        self._hash = 0  # Phần khóa Zobrist ứng với các quân cờ, cập nhật tăng dần
+        self._score = 0  # Điểm vật chất + vị trí theo bên trắng (evaluation.PIECE_SQUARE), cập nhật tăng dần
+        self.piece_count = 0  # Số quân trên bàn cờ, cập nhật tăng dần
+        self._legal_list = []  # Các nước đi hợp lệ (từ, đến, phong cấp) của thế cờ có khóa _legal_key
+        self._legal_map = None  # Cũng các nước đó dạng tên ô, nhóm theo ô đi (tính khi cần)
+        self._legal_key = None
+        # Mỗi loại quân chỉ có một đối tượng Piece dùng chung cho cả bàn cờ
+        self._pieces = {}
+        for code, letter in LETTER_OF.items():
+            self._pieces[code] = pieces.create_piece(letter)
+            self._pieces[code].ref(self)
+        if patt:
+            self.show(patt)  # Khởi tạo bàn cờ từ thế cờ được truyền vào
+        else:
+            self.process_notation(START_PATTERN)  # Khởi tạo bàn cờ từ FEN notation
+
+    # Giao diện dạng dict: khóa là tên ô ('E4'), giá trị là quân cờ
+    def __getitem__(self, coord):
+        code = self.squares[SQUARE_INDEX[coord]]
+        if not code:
+            raise KeyError(coord)
+        return self._pieces[code]
+
+    def __setitem__(self, coord, piece):
+        # Gán None tương đương với làm trống ô
+        self._put(SQUARE_INDEX[coord], piece.code if piece is not None else 0)
+
+    def __delitem__(self, coord):
+        sq = SQUARE_INDEX[coord]
+        if not self.squares[sq]:
+            raise KeyError(coord)
+        self._put(sq, 0)
+
+    def __iter__(self):
+        squares = self.squares
+        return (SQUARE_NAMES[sq] for sq in SQUARES if squares[sq])
+
+    def __len__(self):
+        return self.piece_count
+
+    def __contains__(self, coord):
+        sq = SQUARE_INDEX.get(coord)
+        return sq is not None and self.squares[sq] != 0
+
+    def get(self, coord, default=None):
+        sq = SQUARE_INDEX.get(coord)
+        if sq is None or not self.squares[sq]:
+            return default
+        return self._pieces[self.squares[sq]]
+
+    def clear(self):
+        self.squares[:] = bytes(128)
+        self._kings = [None, None]
+        self._hash = 0
+        self._score = 0
+        self.piece_count = 0
+
+    def _put(self, sq, code):
+        # Ghi mã quân cờ vào ô sq và cập nhật các thông tin được theo dõi tăng dần
+        old = self.squares[sq]
+        if old & 7 == KING and self._kings[old >> 3] == sq:
+            self._kings[old >> 3] = None
+        if code & 7 == KING:
+            self._kings[code >> 3] = sq
+        self._hash ^= zobrist.PIECE_KEYS[old][sq] ^ zobrist.PIECE_KEYS[code][sq]
+        self._score += evaluation.PIECE_SQUARE[code][sq] - evaluation.PIECE_SQUARE[old][sq]
+        self.piece_count += (code != 0) - (old != 0)
+        self.squares[sq] = code
+
+    @property
+    def zobrist_key(self):
+        # Khóa Zobrist của thế cờ: các quân cờ, lượt đi, quyền nhập thành và cột bắt tốt qua đường
+        key = self._hash ^ zobrist.CASTLING_KEYS[self.castling]
+        if self.player_turn == 'black':
+            key ^= zobrist.SIDE_KEY
+        if self.ep_square is not None:
+            key ^= zobrist.EN_PASSANT_KEYS[self.ep_square & 7]
+        return key
+
+    def piece_at(self, sq):
+        """Trả về quân cờ tại chỉ số 0x88 sq, hoặc None nếu ô trống."""
+        code = self.squares[sq]
+        return self._pieces[code] if code else None
+
+    def _reset(self):
+        """Xóa bàn cờ cùng các nước đã đi, chuẩn bị nạp một thế cờ mới."""
+        self.clear()  # Xóa bàn cờ hiện tại
+        self._undo.clear()  # Các nước đã đi không còn hoàn tác được trên thế cờ mới
+        self._keys.clear()
+        self.history.clear()
+        self.castling = 0
+        self.ep_square = None
+        self._legal_key = None
+
+    def _place_pieces(self, placement):
+        """Đặt các quân cờ lên mảng bàn cờ từ phần vị trí quân của FEN notation."""
+        self._reset()
+        row, col = 7, 0  # FEN bắt đầu từ hàng 8, cột A
+        for letter in placement:
+            if letter == '/':
+                row, col = row - 1, 0
+            elif letter.isdigit():
+                col += int(letter)  # Các ô trống liên tiếp
+            else:
+                self._put(row << 4 | col, CODE_OF[letter])
+                col += 1
+
+    # Phương thức xử lý và thiết lập trạng thái bàn cờ từ FEN notation
+    def process_notation(self, patt):  
+        """Xử lý FEN notation và thiết lập bàn cờ (đủ 6 trường, xem show).""" 
+        self.show(patt)
+
+    # Kiểm tra tọa độ có nằm trên bàn cờ không
+    def is_on_board(self, coord):  
+        return 0 <= coord[0] < 8 and 0 <= coord[1] < 8 
+        
+    # Chuyển đổi tọa độ số thành ký tự (ví dụ: (0, 0) -> 'A1')
+    def alpha_notation(self, xycoord):  
+        if not self.is_on_board(xycoord):  
+            return  
+        return SQUARE_NAMES[xycoord[0] << 4 | xycoord[1]]
+
+    # Chuyển đổi tọa độ ký tự thành tọa độ số (ví dụ: 'A1' -> (0, 0))
+    def num_notation(self, xycoord):  
+        sq = SQUARE_INDEX[xycoord]
+        return sq >> 4, sq & 7
+
+    # Các phương thức xử lý quân cờ và nước đi
+    def occupied(self, color):  
+        # Các quân cờ của một màu
+        squares, bit = self.squares, COLOR_BITS[color]
+        return [SQUARE_NAMES[sq] for sq in SQUARES if squares[sq] and squares[sq] & BLACK == bit]
+
+    def all_moves_available(self, color):
+        result = []  
+        squares, bit = self.squares, COLOR_BITS[color]
+        # Duyệt qua tất cả các quân cờ của người chơi
+        for sq in SQUARES:  
+            code = squares[sq]
+            if code and code & BLACK == bit:  
+                # Lấy các nước đi hợp lệ
+                result += [SQUARE_NAMES[to] for to in self._pieces[code].targets(squares, sq)]
+        return result
+
+    def _pseudo_moves(self, bit):
+        # Các nước đi giả hợp lệ (từ, đến) theo chỉ số 0x88 của màu có bit màu là bit
+        result = []
+        squares = self.squares
+        for sq in SQUARES:
+            code = squares[sq]
+            if code and code & BLACK == bit:
+                targets = self._pieces[code].targets(squares, sq)
+                if code & 7 == PAWN and sq >> 4 == (1 if bit else 6):
+                    # Tốt tới hàng cuối: mỗi ô đích là bốn nước phong cấp khác nhau
+                    result += [(sq, to, promotion) for to in targets for promotion in PROMOTIONS]
+                else:
+                    result += [(sq, to, 0) for to in targets]
+        return result
+
+    def _legal_moves(self, bit):
+        # Lọc các nước đi giả hợp lệ bằng cách đi thử rồi hoàn tác tại chỗ
+        color = COLOR_NAMES[bit]
+        result = []
+        for move in self._pseudo_moves(bit):
+            self._make(*move)
+            if not self.king_in_check(color):
+                result.append(move)
+            self._unmake()
+        return result
+
+    def _cached_legal_moves(self):
+        # Các nước đi hợp lệ của bên đang đi, chỉ tính một lần cho mỗi thế cờ: bộ đệm gắn với
+        # khóa Zobrist nên tự hết hạn khi thế cờ thay đổi, và còn dùng lại được sau unmake_move
+        key = self.zobrist_key
+        if self._legal_key != key:
+            self._legal_list = self._legal_moves(COLOR_BITS[self.player_turn])
+            self._legal_map, self._legal_key = None, key
+        return self._legal_list
+
+    def legal_moves(self, color=None):
+        # Các nước đi hợp lệ (không để vua bị chiếu) dạng ('E2', 'E4') hoặc ('E7', 'E8', 'Q')
+        if color is None or color == self.player_turn:
+            return [move_names(move) for move in self._cached_legal_moves()]
+        return [move_names(move) for move in self._legal_moves(COLOR_BITS[color])]
+
+    def legal_move_map(self):
+        # Các nước đi hợp lệ của bên đang đi, nhóm theo ô xuất phát ({'E2': ['E3', 'E4'], ...})
+        moves = self._cached_legal_moves()
+        if self._legal_map is None:
+            grouped = {}
+            for frm, to, promotion in moves:
+                if promotion in (0, QUEEN):  # Các nước phong cấp chung một ô đích
+                    grouped.setdefault(SQUARE_NAMES[frm], []).append(SQUARE_NAMES[to])
+            self._legal_map = grouped
+        return self._legal_map
+
+    def legal_moves_from(self, pos):
+        # Các ô đích hợp lệ của quân tại pos (rỗng nếu không phải quân của bên đang đi)
+        return self.legal_move_map().get(pos.upper(), [])
+
+    def is_legal(self, p1, p2):
+        # Kiểm tra nước đi p1 -> p2 có hợp lệ cho bên đang đi không
+        return p2.upper() in self.legal_moves_from(p1)
+
+    def perft(self, depth):
+        # Đếm số nút lá của cây nước đi hợp lệ ở độ sâu depth (dùng để kiểm tra bộ sinh nước đi)
+        if depth == 0:
+            return 1
+        moves = self._legal_moves(COLOR_BITS[self.player_turn])
+        if depth == 1:
+            return len(moves)  # Đếm gộp ở tầng cuối, không cần đi thử từng nước
+        nodes = 0
+        for move in moves:
+            self._make(*move)
+            nodes += self.perft(depth - 1)
+            self._unmake()
+        return nodes
+
+    def generate_moves(self, color):
+        # Sinh các nước đi giả hợp lệ bằng bitboard, dạng cặp ('E2', 'E4')
+        return bitboard.Bitboards(self).generate_moves(color)
+
+    def position_of_king(self, color):
+        # Vị trí của quân vua được theo dõi sau mỗi nước đi nên không cần tìm lại
+        sq = self._kings[COLOR_BITS[color] >> 3]
+        return SQUARE_NAMES[sq] if sq is not None else None
+
+    def _is_attacked(self, sq, bit):
+        # Kiểm tra ô sq có bị quân màu bit tấn công không, dò ngược ra từ chính ô đó
+        squares = self.squares
+        # Tốt tấn công chéo về phía trước nên nằm ở hàng phía sau ô sq (theo hướng của nó)
+        pawn = PAWN | bit
+        behind = sq + 16 if bit else sq - 16
+        for frm in (behind - 1, behind + 1):
+            if not frm & 0x88 and squares[frm] == pawn:
+                return True
+        knight, king = KNIGHT | bit, KING | bit
+        for step in KNIGHT_OFFSETS:
+            frm = sq + step
+            if not frm & 0x88 and squares[frm] == knight:
+                return True
+        # Các tia dọc/ngang (xe, hậu) và chéo (tượng, hậu)
+        for directions, slider in ((ORTHOGONAL, ROOK), (DIAGONAL, BISHOP)):
+            for step in directions:
+                frm = sq + step
+                if frm & 0x88:
+                    continue
+                code = squares[frm]
+                if code == king:
+                    return True
+                while not code:
+                    frm += step
+                    if frm & 0x88:
+                        break
+                    code = squares[frm]
+                if code and code & BLACK == bit and code & 7 in (slider, QUEEN):
+                    return True
+        return False
+
+    def is_square_attacked(self, pos, color):
+        # Kiểm tra ô pos có bị quân của màu color tấn công không
+        return self._is_attacked(SQUARE_INDEX[pos], COLOR_BITS[color])
+
+    def king_in_check(self, color):
+        # Kiểm tra xem vua có bị chiếu không
+        bit = COLOR_BITS[color]
+        sq = self._kings[bit >> 3]
+        return sq is not None and self._is_attacked(sq, bit ^ BLACK)
+
+    def is_in_check_after_move(self, p1, p2):
+        # Kiểm tra nếu quân cờ di chuyển có khiến vua bị chiếu hay không
+        color = self[p1].color
+        self.make_move(p1, p2)  # Đi thử ngay trên bàn cờ
+        try:
+            return self.king_in_check(color)  # Kiểm tra vua có bị chiếu không
+        finally:
+            self.unmake_move()  # Trả bàn cờ về như cũ
+
+    def shift(self, p1, p2, promotion=None):
+        p1, p2 = p1.upper(), p2.upper()  # Chuyển về chữ hoa để thống nhất
+        piece = self[p1]  
+        dest = self.get(p2)  # Quân cờ ở ô đích (nếu có)
+
+        if self.player_turn != piece.color:  
+            raise NotYourTurn(f"Not {piece.color}'s turn!")  # Kiểm tra lượt đi của người chơi
+
+        legal = self.legal_move_map()  # Các nước đi hợp lệ của thế cờ hiện tại (đã lưu đệm)
+
+        if not legal and self.king_in_check(piece.color):  
+            raise CheckMate("Player's king is in checkmate")  # Nếu không có nước đi và vua bị chiếu, thua
+
+        elif not legal:  
+            raise Draw("Stalemate: No valid moves available")  # Hòa vì không có nước đi hợp lệ
+
+        elif self.is_fifty_moves():  
+            raise Draw("Draw by the fifty-move rule")  # 50 nước không đi tốt, không ăn quân
+
+        elif self.is_repetition():  
+            raise Draw("Draw by threefold repetition")  # Thế cờ lặp lại ba lần
+
+        if p2 not in legal.get(p1, ()):  
+            if p2 not in piece.moves_available(p1):  
+                raise InvalidMove("Invalid move")  # Nước đi không hợp lệ
+            raise Check("Move leaves king in check")  # Nước đi khiến vua bị chiếu
+
+        san = self.san(p1, p2, promotion)  # Ký hiệu của nước đi phải tính trước khi đi
+        self.make_move(p1, p2, promotion)  # Di chuyển quân cờ (kể cả nhập thành, bắt tốt qua đường, phong cấp)
+        self.complete_move(piece, dest, p1, p2, san)  # Hoàn tất nước đi
+
+        
+
+        
+    def move(self, p1, p2):
+        # Di chuyển quân cờ từ p1 đến p2
+        frm, to = SQUARE_INDEX[p1], SQUARE_INDEX[p2]
+        if not self.squares[frm]:
+            raise KeyError(p1)
+        self._legal_key = None  # Thế cờ thay đổi: bộ đệm nước đi hợp lệ hết hạn
+        self._put(to, self.squares[frm])  # Đặt quân cờ tại p2 (quân ở đích, nếu có, bị ăn)
+        self._put(frm, 0)  # Xóa quân cờ tại p1
+
+    def make_move(self, p1, p2, promotion=None):
+        # Thực hiện nước đi tại chỗ, ghi lại thông tin để unmake_move hoàn tác.
+        # promotion là chữ cái quân phong cấp ('Q', 'R', 'B', 'N'); mặc định phong hậu
+        p1, p2 = p1.upper(), p2.upper()  # Chuyển về chữ hoa để thống nhất
+        frm, to = SQUARE_INDEX[p1], SQUARE_INDEX[p2]
+        if not self.squares[frm]:
+            raise KeyError(p1)
+        self._make(frm, to, self._promotion(frm, to, promotion))
+
+    def _promotion(self, frm, to, letter):
+        # Loại quân phong cấp của nước frm -> to (0 nếu không phải nước phong cấp)
+        if self.squares[frm] & 7 != PAWN or to >> 4 not in (0, 7):
+            return 0
+        kind = CODE_OF.get((letter or 'Q').upper(), 0) & 7
+        if kind not in PROMOTIONS:
+            raise InvalidMove(f"Cannot promote to {letter!r}")
+        return kind
+
+    def unmake_move(self):
+        # Hoàn tác nước đi gần nhất của make_move
+        if not self._undo:
+            raise InvalidMove("No move to unmake")
+        self._unmake()
+
+    def _make(self, frm, to, promotion=0):
+        squares = self.squares
+        moved, captured = squares[frm], squares[to]
+        ep_square = self.ep_square
+        self._keys.append(self.zobrist_key)
+        # Thông tin hoàn tác: nước đi (ô đi, ô đến, phong cấp), quân đi, quân bị ăn,
+        # quyền nhập thành, ô bắt tốt qua đường, đồng hồ và lượt đi
+        self._undo.append((frm, to, promotion, moved, captured, self.castling, ep_square,
+                           self.halfmove_clock, self.fullmove_number, self.player_turn))
+        self._put(to, promotion | moved & BLACK if promotion else moved)
+        self._put(frm, 0)
+        self.ep_square = None
+        kind = moved & 7
+        if kind == PAWN:
+            if to == ep_square:
+                self._put(to + 16 if moved & BLACK else to - 16, 0)  # Bắt tốt qua đường
+            elif to - frm in (32, -32):
+                self.ep_square = self._en_passant_target(to, moved & BLACK)
+        elif kind == KING and to - frm in (2, -2):
+            # Nhập thành: xe nhảy qua vua
+            if to > frm:
+                self._put(frm + 1, squares[frm + 3])
+                self._put(frm + 3, 0)
+            else:
+                self._put(frm - 1, squares[frm - 4])
+                self._put(frm - 4, 0)
+        self.castling &= CASTLING_MASK[frm] & CASTLING_MASK[to]
+        if captured or kind == PAWN:
+            self.halfmove_clock = 0  # Ăn quân hoặc đi tốt thì đặt lại đồng hồ nửa nước
+        else:
+            self.halfmove_clock += 1
+        if moved & BLACK:
+            self.fullmove_number += 1
+        self.player_turn = 'white' if moved & BLACK else 'black'
+
+    def _unmake(self):
+        (frm, to, promotion, moved, captured, self.castling, self.ep_square,
+         self.halfmove_clock, self.fullmove_number, self.player_turn) = self._undo.pop()
+        self._keys.pop()
+        self._put(to, captured)
+        self._put(frm, moved)
+        kind = moved & 7
+        if kind == PAWN and to == self.ep_square:
+            self._put(to + 16 if moved & BLACK else to - 16, PAWN | (moved & BLACK) ^ BLACK)
+        elif kind == KING and to - frm in (2, -2):
+            if to > frm:
+                self._put(frm + 3, self.squares[frm + 1])
+                self._put(frm + 1, 0)
+            else:
+                self._put(frm - 4, self.squares[frm - 1])
+                self._put(frm - 1, 0)
+
+    def _en_passant_target(self, to, bit):
+        # Ô bắt tốt qua đường sau khi tốt màu bit đi hai ô tới to, hoặc None nếu không có
+        # tốt đối phương nào đứng cạnh để bắt (giữ khóa Zobrist giống nhau cho cùng thế cờ)
+        pawn = PAWN | bit ^ BLACK
+        squares = self.squares
+        for side in (to - 1, to + 1):
+            if not side & 0x88 and squares[side] == pawn:
+                return to + 16 if bit else to - 16
+        return None
+
+    def complete_move(self, piece, dest, p1, p2, san=None):
+        # Hoàn tất quá trình nước đi sau make_move: ghi nước đi vào lịch sử. Lượt đi, số lần đi
+        # đầy đủ và đồng hồ nửa nước (đặt lại khi đi tốt hoặc ăn quân) đã được _make cập nhật
+        abbr = piece.shortname.upper()  # Lấy ký tự viết tắt của quân cờ
+        if abbr == 'P':  
+            abbr = ''  # Nếu là tốt thì không ghi chữ 'P'
+
+        movetext = san or abbr + ('x' if dest else '') + p2.lower()  # Ghi lại nước đi
+        self.history.append(movetext)  # Thêm vào lịch sử các nước đi
+
+    def is_repetition(self, count=3):
+        # Thế cờ hiện tại đã xuất hiện count lần (kể cả lần này) hay chưa. Chỉ cần dò ngược
+        # halfmove_clock thế cờ (trước đó là nước đi tốt hoặc ăn quân, không thể lặp lại),
+        # và chỉ các thế cờ cùng bên đi, tức là cách nhau 2 nửa nước
+        key = self.zobrist_key
+        keys = self._keys
+        stop = max(len(keys) - self.halfmove_clock, 0)
+        seen = 1
+        for i in range(len(keys) - 2, stop - 1, -2):
+            if keys[i] == key:
+                seen += 1
+                if seen >= count:
+                    return True
+        return False
+
+    def is_fifty_moves(self):
+        # Luật 50 nước: 100 nửa nước liên tiếp không đi tốt và không ăn quân
+        return self.halfmove_clock >= 100
+
+    def is_draw(self):
+        # Hòa theo luật 50 nước hoặc lặp lại thế cờ ba lần
+        return self.is_fifty_moves() or self.is_repetition()
+
+    def san(self, p1, p2, promotion=None):
+        # Ký hiệu đại số chuẩn (SAN) của nước đi hợp lệ p1 -> p2 trong thế cờ hiện tại
+        squares = self.squares
+        frm, to = SQUARE_INDEX[p1], SQUARE_INDEX[p2]
+        code = squares[frm]
+        promotion = self._promotion(frm, to, promotion)
+        if code & 7 == KING and to - frm in (2, -2):
+            text = 'O-O' if to > frm else 'O-O-O'  # Nhập thành cánh vua / cánh hậu
+        elif code & 7 == PAWN:
+            # Tốt đổi cột khi và chỉ khi ăn quân (kể cả bắt tốt qua đường)
+            text = (p1[0].lower() + 'x' if frm & 7 != to & 7 else '') + p2.lower()
+            if promotion:
+                text += '=' + LETTER_OF[promotion]
+        else:
+            # Phân biệt khi có quân cùng loại khác cũng đi được tới ô đích
+            bit = code & BLACK
+            moves = self._cached_legal_moves() if bit == COLOR_BITS[self.player_turn] else self._legal_moves(bit)
+            rivals = [f for f, t, _ in moves if t == to and f != frm and squares[f] == code]
+            qualifier = ''
+            if rivals:
+                if all(f & 7 != frm & 7 for f in rivals):
+                    qualifier = p1[0].lower()
+                elif all(f >> 4 != frm >> 4 for f in rivals):
+                    qualifier = p1[1]
+                else:
+                    qualifier = p1.lower()
+            text = LETTER_OF[code & 7] + qualifier + ('x' if squares[to] else '') + p2.lower()
+
+        # Hậu tố chiếu (+) hoặc chiếu hết (#)
+        opponent = (code & BLACK) ^ BLACK
+        self._make(frm, to, promotion)
+        if self.king_in_check(COLOR_NAMES[opponent]):
+            text += '#' if not self._legal_moves(opponent) else '+'
+        self._unmake()
+        return text
+
+    def _parse_san(self, san):
+        # Nước đi hợp lệ (từ, đến, phong cấp) ứng với ký hiệu SAN cho bên đang đi
+        text = san.rstrip('+#!?')
+        moves = self._cached_legal_moves()
+        if text in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+            frm = KING_HOME[COLOR_BITS[self.player_turn]]
+            to = frm + 2 if len(text) == 3 else frm - 2
+            if (frm, to, 0) in moves and self.squares[frm] & 7 == KING:
+                return frm, to, 0
+            raise InvalidMove(f"Illegal move {san!r}")
+        match = self.SAN_PATTERN.match(text)
+        if not match:
+            raise InvalidMove(f"Cannot parse move {san!r}")
+        letter, file, rank, dest, promoted = match.groups()
+        kind = CODE_OF[letter] if letter else PAWN
+        to = SQUARE_INDEX[dest.upper()]
+        if promoted:
+            promotion = CODE_OF[promoted] & 7
+        else:
+            promotion = QUEEN if kind == PAWN and to >> 4 in (0, 7) else 0  # Thiếu "=Q" thì coi là phong hậu
+        candidates = []
+        for move in moves:
+            frm, t, p = move
+            if t != to or p != promotion or self.squares[frm] & 7 != kind:
+                continue
+            name = SQUARE_NAMES[frm]
+            if (file and name[0] != file.upper()) or (rank and name[1] != rank):
+                continue
+            candidates.append(move)
+        if len(candidates) != 1:
+            raise InvalidMove(f"Illegal or ambiguous move {san!r}")
+        return candidates[0]
+
+    def parse_san(self, san):
+        # Tìm nước đi hợp lệ ('E2', 'E4') hoặc ('E7', 'E8', 'Q') ứng với ký hiệu SAN cho bên đang đi
+        return move_names(self._parse_san(san))
+
+    def push_san(self, san):
+        # Đi một nước cho bởi ký hiệu SAN và ghi vào lịch sử
+        move = self._parse_san(san)
+        names = move_names(move)
+        self.history.append(self.san(*names))
+        self._make(*move)
+        return names
+
+    # Hiển thị trạng thái bàn cờ
+    @staticmethod
+    def _check_fen(fields):
+        """Kiểm tra các trường FEN đã tách; ValueError nếu sai, để bàn cờ chưa bị đụng tới."""
+        if len(fields) < 2:
+            raise ValueError('FEN needs at least a placement and a side to move')
+        ranks = fields[0].split('/')
+        if len(ranks) != 8:
+            raise ValueError(f'FEN placement has {len(ranks)} ranks, expected 8')
+        for rank in ranks:
+            width = 0
+            for letter in rank:
+                if letter in '12345678':
+                    width += int(letter)
+                elif letter in CODE_OF:
+                    width += 1
+                else:
+                    raise ValueError(f'unknown piece letter {letter!r} in FEN')
+            if width != 8:
+                raise ValueError(f'FEN rank {rank!r} covers {width} squares, expected 8')
+        if fields[1] not in ('w', 'b'):
+            raise ValueError(f'bad side to move {fields[1]!r} in FEN')
+        if len(fields) > 2 and not fields[2].isdigit():  # Dạng rút gọn cũ: đồng hồ ngay sau lượt đi
+            castling = fields[2]
+            if castling != '-' and (set(castling) - set(CASTLING_LETTERS) or len(set(castling)) != len(castling)):
+                raise ValueError(f'bad castling field {castling!r} in FEN')
+            if len(fields) > 3 and fields[3] != '-' and \
+                    not (len(fields[3]) == 2 and fields[3][0] in 'abcdefgh' and fields[3][1] in '36'):
+                raise ValueError(f'bad en passant field {fields[3]!r} in FEN')
+            clocks = fields[4:6]
+        else:
+            clocks = fields[2:4]
+        if not all(clock.isdigit() for clock in clocks):
+            raise ValueError(f'bad move clocks {" ".join(clocks)!r} in FEN')
+
+    def show(self, pat):
+        pat = pat.split()  # Tách FEN notation ra
+        self._check_fen(pat)  # Kiểm tra trước khi xóa bàn cờ
+        self._place_pieces(pat[0])  # Đặt các quân cờ lên bàn cờ từ FEN notation
+
+        # Thiết lập lại các thông số trò chơi
+        self.player_turn = 'white' if pat[1] == 'w' else 'black'
+        # FEN đầy đủ có 6 trường: vị trí quân, lượt đi, quyền nhập thành, ô bắt tốt qua đường và
+        # hai đồng hồ; dạng rút gọn cũ chỉ có 2 đồng hồ sau lượt đi; thiếu trường thì dùng giá trị đầu ván
+        if len(pat) > 2 and not pat[2].isdigit():
+            self.castling = sum(1 << CASTLING_LETTERS.index(letter) for letter in pat[2] if letter in CASTLING_LETTERS)
+        if len(pat) > 3 and pat[3] != '-' and not pat[3].isdigit():
+            target = SQUARE_INDEX[pat[3].upper()]
+            mover = BLACK if target >> 4 == 5 else 0  # Màu của tốt vừa đi hai ô
+            self.ep_square = self._en_passant_target(target - 16 if mover else target + 16, mover)
+        if len(pat) >= 6:
+            clocks = pat[4:6]
+        elif len(pat) >= 4 and pat[2].isdigit():
+            clocks = pat[2:4]
+        else:
+            clocks = ('0', '1')
+        self.halfmove_clock = int(clocks[0])
+        self.fullmove_number = int(clocks[1])
+
+    def fen(self):
+        # Xuất thế cờ hiện tại dạng FEN đầy đủ 6 trường
+        rows = []
+        for row in range(7, -1, -1):
+            text, empty = '', 0
+            for col in range(8):
+                code = self.squares[row << 4 | col]
+                if code:
+                    text += (str(empty) if empty else '') + LETTER_OF[code]
+                    empty = 0
+                else:
+                    empty += 1
+            rows.append(text + (str(empty) if empty else ''))
+        castling = ''.join(letter for i, letter in enumerate(CASTLING_LETTERS) if self.castling >> i & 1) or '-'
+        ep = SQUARE_NAMES[self.ep_square].lower() if self.ep_square is not None else '-'
+        turn = 'w' if self.player_turn == 'white' else 'b'
+        return f"{'/'.join(rows)} {turn} {castling} {ep} {self.halfmove_clock} {self.fullmove_number}"
@@ -0,0 +1,174 @@
+# Mã hóa nhị phân gọn cho thế cờ và ván cờ, dùng để lưu hàng triệu thế cờ trong tệp
+# (có thể ánh xạ bộ nhớ bằng mmap) và nạp lại mà không phải phân tích FEN.
+#
+# Thế cờ có kích thước cố định POSITION_SIZE byte:
+#   8 byte   bitmap các ô có quân (bit hàng * 8 + cột)
+#   16 byte  mã quân cờ (4 bit mỗi quân) theo thứ tự ô tăng dần, nửa byte thấp trước;
+#            mã 7 (không dùng cho quân nào) là tốt vừa đi hai ô và có thể bị bắt qua đường
+#   1 byte   trạng thái: bit 0 là lượt đi (1 = đen), bit 1-4 là quyền nhập thành KQkq
+#   1 byte   đồng hồ nửa nước (tối đa 255)
+#   2 byte   số lần đi đầy đủ
+# Nước đi chiếm 2 byte: ô đi (6 bit) | ô đến (6 bit) << 6 | quân phong cấp (3 bit) << 12.
+import mmap
+import os
+import struct
+
+from bitboard import iter_bits, to_0x88, to_64
+from chessboard import Board, move_names
+from pieces import BLACK, CODE_OF, PAWN
+from squares import SQUARES, SQUARE_INDEX
+
+EN_PASSANT_PAWN = 7  # Mã nửa byte của tốt có thể bị bắt qua đường (màu là màu bên vừa đi)
+
+POSITION = struct.Struct('<Q16sBBH')
+POSITION_SIZE = POSITION.size
+MOVE_SIZE = 2
+
+
+def encode_position(board):
+    """Mã hóa thế cờ hiện tại của board thành POSITION_SIZE byte."""
+    squares = board.squares
+    occupancy = 0
+    nibbles = bytearray(16)
+    count = 0
+    black = board.player_turn == 'black'
+    # Tốt có thể bị bắt qua đường đứng ngay trước ô bắt tốt qua đường (theo hướng đi của nó)
+    ep_pawn = None
+    if board.ep_square is not None:
+        ep_pawn = board.ep_square + 16 if black else board.ep_square - 16
+    for sq in SQUARES:
+        code = squares[sq]
+        if code:
+            if sq == ep_pawn:
+                code = EN_PASSANT_PAWN
+            occupancy |= 1 << to_64(sq)
+            nibbles[count >> 1] |= code << 4 if count & 1 else code
+            count += 1
+    state = black | board.castling << 1
+    return POSITION.pack(occupancy, bytes(nibbles), state,
+                         min(board.halfmove_clock, 255), board.fullmove_number)
+
+
+def decode_position(buffer, board=None, offset=0):
+    """Nạp thế cờ đã mã hóa (bytes, memoryview hoặc mmap) tại offset vào board."""
+    board = board if board is not None else Board()
+    occupancy, nibbles, state, halfmove, fullmove = POSITION.unpack_from(buffer, offset)
+    board._reset()
+    for count, sq in enumerate(iter_bits(occupancy)):
+        byte = nibbles[count >> 1]
+        code = byte >> 4 if count & 1 else byte & 15
+        sq = to_0x88(sq)
+        if code == EN_PASSANT_PAWN:
+            # Tốt của bên vừa đi (không phải bên đang đi); ô bắt tốt qua đường nằm sau nó
+            code = PAWN if state & 1 else PAWN | BLACK
+            board.ep_square = sq - 16 if state & 1 else sq + 16
+        board._put(sq, code)
+    board.player_turn = 'black' if state & 1 else 'white'
+    board.castling = state >> 1 & 15
+    board.halfmove_clock = halfmove
+    board.fullmove_number = fullmove
+    return board
+
+
+def encode_move(frm, to, promotion=0):
+    """Mã hóa nước đi (chỉ số 0x88, loại quân phong cấp) thành số nguyên 16 bit."""
+    return to_64(frm) | to_64(to) << 6 | promotion << 12
+
+
+def decode_move(value):
+    """Giải mã số nguyên 16 bit thành (ô đi, ô đến, loại quân phong cấp) theo chỉ số 0x88."""
+    return to_0x88(value & 63), to_0x88(value >> 6 & 63), value >> 12
+
+
+def encode_moves(moves):
+    """Mã hóa danh sách nước đi dạng ('E2', 'E4') hoặc ('E7', 'E8', 'Q') thành bytes, 2 byte mỗi nước."""
+    values = [encode_move(SQUARE_INDEX[move[0]], SQUARE_INDEX[move[1]],
+                          CODE_OF[move[2]] & 7 if len(move) > 2 else 0) for move in moves]
+    return struct.pack(f'<{len(values)}H', *values)
+
+
+def decode_moves(buffer):
+    """Giải mã bytes thành danh sách nước đi dạng ('E2', 'E4') hoặc ('E7', 'E8', 'Q')."""
+    values = struct.unpack_from(f'<{len(buffer) // MOVE_SIZE}H', buffer)
+    return [move_names(decode_move(value)) for value in values]
+
+
+def encode_game(board):
+    """Mã hóa thế cờ ban đầu và các nước đã đi (qua make_move) trên board.
+    Bàn cờ được hoàn tác về đầu rồi đi lại, nên trở về nguyên trạng sau khi mã hóa."""
+    moves = [entry[:3] for entry in board._undo]  # (ô đi, ô đến, phong cấp)
+    for _ in moves:
+        board._unmake()
+    start = encode_position(board)
+    for move in moves:
+        board._make(*move)
+    return start + struct.pack(f'<H{len(moves)}H', len(moves),
+                               *(encode_move(*move) for move in moves))
+
+
+def decode_game(buffer, board=None, offset=0):
+    """Nạp ván cờ đã mã hóa vào board: thế cờ ban đầu rồi đi lại các nước bằng make_move."""
+    board = decode_position(buffer, board, offset)
+    offset += POSITION_SIZE
+    (count,) = struct.unpack_from('<H', buffer, offset)
+    for value in struct.unpack_from(f'<{count}H', buffer, offset + 2):
+        board._make(*decode_move(value))
+    return board
+
+
+def encode_positions(boards):
+    """Mã hóa nhiều thế cờ liên tiếp thành một khối bytes."""
+    return b''.join(encode_position(board) for board in boards)
+
+
+class PositionArray:
+    """Dãy thế cờ đã mã hóa nằm liền nhau trong một bộ đệm (bytes, memoryview, mmap);
+    thế cờ chỉ được giải mã khi truy cập."""
+
+    def __init__(self, buffer):
+        self._source = buffer
+        self.buffer = memoryview(buffer)
+
+    def __len__(self):
+        return len(self.buffer) // POSITION_SIZE
+
+    def raw(self, index):
+        """Phần bytes đã mã hóa của thế cờ thứ index (không sao chép)."""
+        start = index * POSITION_SIZE
+        return self.buffer[start:start + POSITION_SIZE]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return decode_position(self.buffer, offset=index * POSITION_SIZE)
+
+    def iter_boards(self, board=None):
+        """Giải mã lần lượt từng thế cờ vào cùng một board (mặc định là một Board mới)."""
+        board = board if board is not None else Board()
+        for offset in range(0, len(self) * POSITION_SIZE, POSITION_SIZE):
+            yield decode_position(self.buffer, board, offset)
+
+    def close(self):
+        self.buffer.release()
+        if hasattr(self._source, 'close'):
+            self._source.close()  # Đóng mmap nếu bộ đệm là tệp ánh xạ bộ nhớ
+
+
+def write_positions(path, boards):
+    """Ghi các thế cờ vào tệp nhị phân; trả về số thế cờ đã ghi."""
+    count = 0
+    with open(path, 'wb') as f:
+        for board in boards:
+            f.write(encode_position(board))
+            count += 1
+    return count
+
+
+def open_positions(path):
+    """Ánh xạ tệp thế cờ vào bộ nhớ (chỉ đọc) và trả về PositionArray trên đó."""
+    if not os.path.getsize(path):
+        return PositionArray(b'')  # mmap không ánh xạ được tệp rỗng
+    with open(path, 'rb') as f:
+        return PositionArray(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
@@ -0,0 +1,101 @@
+# Máy cờ chạy nền cho giao diện: một tiến trình con nhận công việc qua hàng đợi, tính trên
+# Board riêng của nó rồi trả kết quả qua một hàng đợi khác. Giao diện chỉ gửi việc (submit)
+# và đọc kết quả (poll, gọi định kỳ bằng root.after) nên không bao giờ phải chờ máy cờ.
+#
+# Thế cờ được gửi dưới dạng mã hóa nhị phân của codec (thế cờ ban đầu và các nước đã đi).
+# Mỗi công việc có một số thứ tự; gửi việc mới hoặc cancel() làm công việc đang chạy dừng
+# ở lần kiểm tra giới hạn kế tiếp của Searcher, và kết quả cũ không bao giờ được trả về.
+import multiprocessing
+import queue
+
+import codec
+from chessboard import Board
+from search import Searcher
+from transposition import TranspositionTable
+
+SEARCH = 'search'  # Tìm nước đi tốt nhất, kết quả là search.SearchResult
+MOVES = 'moves'  # Các nước đi hợp lệ, kết quả là {'E2': ['E3', 'E4'], ...}
+
+
+class _Cancelled:
+    """Cờ dừng truyền cho Searcher: bật khi đã có công việc mới hơn job_id."""
+
+    def __init__(self, current, job_id):
+        self.current = current
+        self.job_id = job_id
+
+    def is_set(self):
+        return self.current.value != self.job_id
+
+
+def _serve(jobs, results, current):
+    """Vòng lặp của tiến trình con: Board và bảng chuyển vị được dùng lại giữa các công việc."""
+    board = Board()
+    tt = TranspositionTable(1 << 16)
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, kind, position, depth, movetime = job
+        if current.value != job_id:
+            continue  # Đã bị hủy trước khi bắt đầu
+        codec.decode_game(position, board)
+        if kind == MOVES:
+            payload = board.legal_move_map()
+        else:
+            found = Searcher(board, tt).search(depth=depth, movetime=movetime,
+                                               stop_event=_Cancelled(current, job_id))
+            if current.value != job_id:
+                continue  # Bị hủy giữa chừng: kết quả dở dang không còn dùng được
+            payload = found
+        results.put((job_id, kind, payload))
+
+
+class EngineWorker:
+    """Tiến trình máy cờ chạy nền, điều khiển từ luồng giao diện mà không chặn."""
+
+    def __init__(self, depth=64, movetime=2.0):
+        self.depth = depth
+        self.movetime = movetime
+        context = multiprocessing.get_context('spawn')  # Không fork tiến trình đang chạy Tk
+        self._jobs = context.Queue()
+        self._results = context.Queue()
+        self._current = context.Value('q', 0, lock=False)  # Số thứ tự công việc còn hiệu lực
+        self._process = context.Process(target=_serve, args=(self._jobs, self._results, self._current),
+                                        daemon=True)
+        self._next_id = 0
+
+    def start(self):
+        self._process.start()
+        return self
+
+    def submit(self, board, kind=SEARCH, depth=None, movetime=None):
+        """Gửi thế cờ của board cho máy cờ; hủy công việc trước đó. Trả về số thứ tự công việc."""
+        self._next_id += 1
+        self._current.value = self._next_id
+        self._jobs.put((self._next_id, kind, codec.encode_game(board),
+                        depth or self.depth, movetime if movetime is not None else self.movetime))
+        return self._next_id
+
+    def cancel(self):
+        """Hủy công việc đang chờ hoặc đang chạy (ví dụ khi thế cờ trên giao diện thay đổi)."""
+        self._next_id += 1
+        self._current.value = self._next_id
+
+    def poll(self):
+        """Kết quả (job_id, kind, payload) của công việc hiện tại nếu đã xong, ngược lại None.
+        Không bao giờ chờ; kết quả của các công việc đã bị hủy được bỏ qua."""
+        while True:
+            try:
+                job_id, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                return None
+            if job_id == self._current.value:
+                return job_id, kind, payload
+
+    def close(self):
+        self.cancel()
+        self._jobs.put(None)
+        self._process.join(timeout=1)
+        if self._process.is_alive():
+            self._process.terminate()
@@ -0,0 +1,325 @@
+# Hàm đánh giá tĩnh: vật chất cộng bảng điểm vị trí (PST), độ linh động của mã, tượng, xe,
+# hậu và cấu trúc tốt (tốt chồng, tốt cô lập, tốt thông). Có hai cách tính cho cùng một kết quả:
+#
+#  - evaluate(board): một thế cờ; phần vật chất + PST được Board cập nhật tăng dần trong _put
+#    (board._score) nên chỉ còn phải tính độ linh động và cấu trúc tốt.
+#  - evaluate_batch(planes): hàng nghìn thế cờ một lúc bằng NumPy trên mảng các mặt phẳng quân
+#    cờ xếp chồng (N, 12, 64), tạo từ các Board (board_planes) hoặc thẳng từ dữ liệu codec
+#    (codec_planes) mà không phải dựng Board.
+#
+# Điểm tính bằng centipawn; evaluate trả về theo bên đang đi, evaluate_batch theo bên trắng
+# (hoặc theo bên đang đi nếu truyền vào mảng black).
+from bitboard import to_64
+from pieces import BISHOP, BLACK, KING, KNIGHT, PAWN, QUEEN, ROOK
+from squares import SQUARES
+
+try:
+    import numpy as np
+except ImportError:  # NumPy chỉ cần cho đường tính theo lô
+    np = None
+
+# Giá trị quân cờ theo loại (PAWN..KING); vua không tính vào điểm vật chất
+PIECE_VALUES = (0, 100, 320, 330, 500, 900, 20000)
+MATERIAL = PIECE_VALUES[:KING] + (0,)
+
+# Bảng điểm vị trí theo góc nhìn bên trắng, viết từ hàng 8 xuống hàng 1 như khi nhìn bàn cờ
+_TABLES = {
+    PAWN: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0),
+    KNIGHT: (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50),
+    BISHOP: (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20),
+    ROOK: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0),
+    QUEEN: (
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20),
+    KING: (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20),
+}
+
+# PST[loại][ô 0..63] theo bên trắng; quân đen dùng ô lật dọc (sq ^ 56)
+PST = [None] + [[_TABLES[kind][sq ^ 56] for sq in range(64)] for kind in range(PAWN, KING + 1)]
+
+# PIECE_SQUARE[mã quân][chỉ số 0x88]: vật chất + vị trí theo bên trắng (quân đen mang dấu âm),
+# mã 0 toàn số 0 để Board._put cộng dồn không phải rẽ nhánh
+PIECE_SQUARE = [[0] * 128 for _ in range(16)]
+for _kind in range(PAWN, KING + 1):
+    for _sq in SQUARES:
+        PIECE_SQUARE[_kind][_sq] = MATERIAL[_kind] + PST[_kind][to_64(_sq)]
+        PIECE_SQUARE[_kind | BLACK][_sq] = -(MATERIAL[_kind] + PST[_kind][to_64(_sq) ^ 56])
+del _kind, _sq
+
+MOBILITY = {KNIGHT: 4, BISHOP: 3, ROOK: 2, QUEEN: 1}  # Điểm cho mỗi ô quân đó đi tới được
+DOUBLED_PAWN = -10  # Mỗi tốt thừa trên cùng một cột
+ISOLATED_PAWN = -10  # Mỗi tốt không có tốt cùng màu ở hai cột bên cạnh
+PASSED_PAWN = (0, 5, 10, 20, 35, 60, 100, 0)  # Tốt thông theo hàng tính từ phía bên mình
+
+
+def pawn_structure(squares):
+    """Điểm cấu trúc tốt theo bên trắng trên mảng bàn cờ 0x88."""
+    files = ([0] * 8, [0] * 8)  # Số tốt trên mỗi cột: trắng, đen
+    highest_black = [-1] * 8  # Hàng cao nhất có tốt đen trên mỗi cột
+    lowest_white = [8] * 8  # Hàng thấp nhất có tốt trắng trên mỗi cột
+    pawns = []
+    for sq in SQUARES:
+        code = squares[sq]
+        if code & 7 == PAWN:
+            row, col = sq >> 4, sq & 7
+            black = code >> 3
+            files[black][col] += 1
+            pawns.append((black, row, col))
+            if black:
+                highest_black[col] = max(highest_black[col], row)
+            else:
+                lowest_white[col] = min(lowest_white[col], row)
+
+    score = 0
+    for black in (0, 1):
+        counts = files[black]
+        penalty = 0
+        for col in range(8):
+            if counts[col]:
+                penalty += (counts[col] - 1) * DOUBLED_PAWN
+                if not (col > 0 and counts[col - 1]) and not (col < 7 and counts[col + 1]):
+                    penalty += counts[col] * ISOLATED_PAWN
+        score += -penalty if black else penalty
+
+    for black, row, col in pawns:
+        span = range(max(col - 1, 0), min(col + 1, 7) + 1)
+        if black:
+            if all(lowest_white[c] >= row for c in span):  # Không còn tốt trắng nào phía trước
+                score -= PASSED_PAWN[7 - row]
+        elif all(highest_black[c] <= row for c in span):
+            score += PASSED_PAWN[row]
+    return score
+
+
+def mobility(board):
+    """Điểm linh động theo bên trắng: số ô mã, tượng, xe, hậu đi tới được (trống hoặc có quân đối phương)."""
+    squares = board.squares
+    pieces = board._pieces
+    score = 0
+    for sq in SQUARES:
+        code = squares[sq]
+        weight = MOBILITY.get(code & 7)
+        if weight:
+            count = len(pieces[code].targets(squares, sq))
+            score += -weight * count if code & BLACK else weight * count
+    return score
+
+
+def evaluate(board):
+    """Đánh giá thế cờ của board theo góc nhìn của bên đang đi."""
+    score = board._score + pawn_structure(board.squares) + mobility(board)
+    return -score if board.player_turn == 'black' else score
+
+
+# Đường tính theo lô (NumPy). Mặt phẳng p của một thế cờ ứng với mã quân PLANE_CODES[p]:
+# tốt, mã, tượng, xe, hậu, vua trắng rồi tốt, ..., vua đen; ô theo chỉ số 0..63. Khi đánh giá,
+# các mặt phẳng được gói thành bitboard uint64 để mỗi phép dịch, AND, đếm bit xử lý cả lô một lúc.
+PLANE_CODES = tuple(range(PAWN, KING + 1)) + tuple(kind | BLACK for kind in range(PAWN, KING + 1))
+FILES = [0x0101010101010101 << col for col in range(8)]
+RANKS = [0xFF << (8 * row) for row in range(8)]
+
+
+def _step(dr, dc):
+    # Bước (dr hàng, dc cột) trên bitboard: số bit cần dịch và mặt nạ bỏ các bit tràn sang mép bên kia
+    mask = sum(FILES[col] for col in range(max(dc, 0), 8 + min(dc, 0)))
+    return dr * 8 + dc, mask
+
+
+_KNIGHT_STEPS = [_step(dr, dc) for dr, dc in ((2, 1), (2, -1), (1, 2), (1, -2),
+                                              (-1, 2), (-1, -2), (-2, 1), (-2, -1))]
+_SLIDES = {
+    BISHOP: [_step(dr, dc) for dr, dc in ((1, 1), (1, -1), (-1, 1), (-1, -1))],
+    ROOK: [_step(dr, dc) for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1))],
+}
+_SLIDES[QUEEN] = _SLIDES[BISHOP] + _SLIDES[ROOK]
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('numpy is required for batched evaluation')
+
+
+def codes_planes(codes):
+    """Mảng mã quân (N, 64) thành các mặt phẳng quân cờ (N, 12, 64) kiểu uint8."""
+    _require_numpy()
+    return (codes[:, None, :] == np.array(PLANE_CODES, dtype=codes.dtype)[None, :, None]).astype(np.uint8)
+
+
+def board_planes(boards):
+    """Các mặt phẳng quân cờ (N, 12, 64) và mảng lượt đi black (N,) của một dãy Board."""
+    _require_numpy()
+    index = np.array(SQUARES)
+    boards = list(boards)
+    codes = np.empty((len(boards), 64), dtype=np.uint8)
+    black = np.empty(len(boards), dtype=bool)
+    for i, board in enumerate(boards):
+        codes[i] = np.frombuffer(board.squares, dtype=np.uint8)[index]
+        black[i] = board.player_turn == 'black'
+    return codes_planes(codes), black
+
+
+def codec_planes(buffer):
+    """Các mặt phẳng quân cờ và mảng lượt đi đọc thẳng từ dãy thế cờ mã hóa bằng codec
+    (bytes, memoryview hoặc mmap), không dựng Board nào."""
+    _require_numpy()
+    from codec import EN_PASSANT_PAWN, POSITION, POSITION_SIZE
+
+    dtype = np.dtype([('occupancy', '<u8'), ('nibbles', 'u1', 16), ('state', 'u1'),
+                      ('halfmove', 'u1'), ('fullmove', '<u2')])
+    assert dtype.itemsize == POSITION.size
+    records = np.frombuffer(buffer, dtype=dtype, count=len(buffer) // POSITION_SIZE)
+    # Bit thứ sq của bitmap cho biết ô sq có quân; quân thứ k (theo ô tăng dần) ở nửa byte thứ k
+    bits = np.unpackbits(records['occupancy'].astype('<u8').view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    nibbles = records['nibbles']
+    values = np.stack((nibbles & 15, nibbles >> 4), axis=2).reshape(len(records), 32)
+    order = np.clip(np.cumsum(bits, axis=1) - 1, 0, 31)
+    codes = np.where(bits, np.take_along_axis(values, order, axis=1), 0).astype(np.uint8)
+    black = (records['state'] & 1).astype(bool)
+    # Tốt có thể bị bắt qua đường thuộc bên vừa đi, tức là ngược với bên đang đi
+    ep_pawn = np.where(black, PAWN, PAWN | BLACK).astype(np.uint8)[:, None]
+    codes = np.where(codes == EN_PASSANT_PAWN, ep_pawn, codes)
+    return codes_planes(codes), black
+
+
+if np is not None and hasattr(np, 'bitwise_count'):
+    def _popcount(bb):
+        return np.bitwise_count(bb).astype(np.int64)
+else:
+    _BYTE_COUNTS = [bin(byte).count('1') for byte in range(256)]
+
+    def _popcount(bb):
+        return np.array(_BYTE_COUNTS, dtype=np.int64)[np.ascontiguousarray(bb).view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def _shift(bb, step):
+    shift, mask = step
+    if shift > 0:
+        bb = bb << np.uint64(shift)
+    else:
+        bb = bb >> np.uint64(-shift)
+    return bb & np.uint64(mask)
+
+
+def _batch_mobility(pieces, own, empty):
+    """Điểm linh động của một màu; pieces là các bitboard (N, 6) của màu đó."""
+    not_own = ~own
+    score = np.zeros(pieces.shape[0], dtype=np.int64)
+    knights = pieces[:, KNIGHT - 1]
+    for step in _KNIGHT_STEPS:
+        score += MOBILITY[KNIGHT] * _popcount(_shift(knights, step) & not_own)
+    for kind, steps in _SLIDES.items():
+        for step in steps:
+            # Cùng một hướng, tia của quân đứng sau dừng trước quân đứng trước nên các tia
+            # không chồng lên nhau và gộp bằng OR vẫn đếm đúng từng nước
+            front = _shift(pieces[:, kind - 1], step)
+            ray = front
+            for _ in range(6):
+                front = _shift(front & empty, step)
+                ray |= front
+            score += MOBILITY[kind] * _popcount(ray & not_own)
+    return score
+
+
+def _batch_pawns(white, black):
+    """Điểm cấu trúc tốt theo bên trắng; white, black là bitboard tốt (N,)."""
+    score = np.zeros(white.shape[0], dtype=np.int64)
+    for pawns, sign in ((white, 1), (black, -1)):
+        counts = np.stack([_popcount(pawns & np.uint64(mask)) for mask in FILES], axis=1)
+        padded = np.pad(counts, ((0, 0), (1, 1)))
+        isolated = (padded[:, :-2] == 0) & (padded[:, 2:] == 0)
+        penalty = (np.maximum(counts - 1, 0).sum(axis=1) * DOUBLED_PAWN
+                   + (counts * isolated).sum(axis=1) * ISOLATED_PAWN)
+        score += sign * penalty
+
+    # Tốt thông: không có tốt đối phương phía trước trên cột của nó và hai cột bên cạnh
+    for pawns, enemy, sign in ((white, black, 1), (black, white, -1)):
+        # Các ô tốt đối phương còn phải đi qua (phía trước nó theo chiều đi của nó)
+        front = _shift(enemy, _step(-sign, 0))
+        for rows in (1, 2, 4):
+            front |= _shift(front, _step(-sign * rows, 0))
+        span = front | _shift(front, _step(0, 1)) | _shift(front, _step(0, -1))
+        passed = pawns & ~span
+        for row, mask in enumerate(RANKS):
+            bonus = PASSED_PAWN[row if sign > 0 else 7 - row]
+            if bonus:
+                score += sign * bonus * _popcount(passed & np.uint64(mask))
+    return score
+
+
+_WEIGHTS = None
+
+
+def _weights():
+    # Vectơ (12 * 64) vật chất + vị trí theo bên trắng, tính một lần
+    global _WEIGHTS
+    if _WEIGHTS is None:
+        _WEIGHTS = np.array([PIECE_SQUARE[code][sq] for code in PLANE_CODES for sq in SQUARES], dtype=np.int32)
+    return _WEIGHTS
+
+
+def evaluate_batch(planes, black=None):
+    """Đánh giá cùng lúc nhiều thế cờ cho bởi các mặt phẳng quân cờ (N, 12, 64). Trả về mảng
+    điểm (N,) theo bên trắng, hoặc theo bên đang đi nếu có mảng black (N,) (True = đen đi)."""
+    _require_numpy()
+    planes = np.asarray(planes, dtype=np.uint8)
+    n = planes.shape[0]
+    score = planes.reshape(n, len(PLANE_CODES) * 64).astype(np.int32) @ _weights()
+    score = score.astype(np.int64)
+
+    # Gói mỗi mặt phẳng 64 ô thành một bitboard, bit thứ sq ứng với ô sq
+    boards = np.packbits(planes, axis=2, bitorder='little').view('<u8').reshape(n, 2, 6)
+    white, black_pieces = boards[:, 0], boards[:, 1]
+    own = np.bitwise_or.reduce(boards, axis=2)
+    empty = ~(own[:, 0] | own[:, 1])
+    score += _batch_mobility(white, own[:, 0], empty)
+    score -= _batch_mobility(black_pieces, own[:, 1], empty)
+    score += _batch_pawns(white[:, PAWN - 1], black_pieces[:, PAWN - 1])
+    if black is not None:
+        score = np.where(black, -score, score)
+    return score
@@ -1,175 +1,247 @@
-from tkinter import *
-from PIL import ImageTk
-from chessboard import Board, ChessError, START_PATTERN
-from tkinter import messagebox
-class ChessGUI:
-    pieces = {}  # Lưu trữ các quân cờ
-    selected_piece = None  # Quân cờ đã chọn
-    focused = None  # Các ô có thể di chuyển của quân cờ đã chọn
-    rows = 8  # Số hàng
-    columns = 8  # Số cột
-    color1 = "#DDB88C"  # Màu của các ô sáng
-    color2 = "#A66D4F"  # Màu của các ô tối
-    dim_square = 64  # Kích thước của mỗi ô
-    highlightcolor = "khaki"  # Màu nền của ô đang được chọn
-
-    def __init__(self, parent, chessboard):
-        """Khởi tạo giao diện người dùng cho trò chơi cờ vua."""
-        self.parent = parent
-        self.chessboard = chessboard
-
-        # Khởi tạo menu
-        self.menubar = Menu(parent)
-        self.filemenu = Menu(self.menubar, tearoff=0)
-        self.filemenu.add_command(label="New Game", command=self.new_game)  # Menu "New Game"
-        self.menubar.add_cascade(label="File", menu=self.filemenu)
-        self.parent.config(menu=self.menubar)
-
-        # Khởi tạo thông tin ở dưới cùng
-        self.btmfrm = Frame(parent, height=64)
-        self.info_label = Label(self.btmfrm, text="   Black to Start the Game", fg=self.color2)
-        self.info_label.pack(side=RIGHT, padx=8, pady=5)
-        self.btmfrm.pack(fill="x", side=BOTTOM)
-
-        self.images = {}  # Lưu trữ hình ảnh quân cờ
-
-        # Khởi tạo canvas vẽ bàn cờ
-        canvas_width = self.columns * self.dim_square
-        canvas_height = self.rows * self.dim_square
-        self.canvas = Canvas(parent, width=canvas_width, height=canvas_height, background="grey")
-        self.canvas.pack(padx=8, pady=8)
-
-        self.draw_board()  # Vẽ bàn cờ
-        self.draw_pieces()  # Vẽ các quân cờ
-        self.canvas.bind("<Button-1>", self.square_clicked)  # Xử lý sự kiện khi nhấp vào ô cờ
-
-    def new_game(self):
-        """Khởi tạo lại bàn cờ và giao diện sau mỗi ván chơi mới."""
-        self.chessboard.show(START_PATTERN)  # Hiển thị trạng thái khởi đầu
-        self.draw_board()
-        self.draw_pieces()
-        self.info_label.config(text="Black to Start the Game", fg="red")  # Cập nhật thông tin
-
-    def shift(self, p1, p2):
-        """
-        Xử lý nước đi và cập nhật thông tin hiển thị.
-        p1: Vị trí ban đầu của quân cờ.
-        p2: Vị trí đích đến.
-        """
-        piece = self.chessboard.get_piece(p1)  # Lấy quân cờ tại p1
-        try:
-            dest_piece = self.chessboard.get_piece(p2)
-        except KeyError:  # Nếu vị trí đích không tồn tại
-            dest_piece = None
-
-        if dest_piece is None or dest_piece.color != piece.color:
-            try:
-                self.chessboard.shift(p1, p2)  # Thực hiện nước đi
-            except self.chessboard.ChessError as error:
-                # Hiển thị lỗi nếu nước đi không hợp lệ
-                self.info_label.config(text=f"Error: {error.__class__.__name__}")
-            else:
-                # Cập nhật thông tin về lượt đi
-                next_turn = "White" if piece.color == "black" else "Black"
-                self.info_label.config(
-                    text=f"{piece.color.capitalize()} moved {p1} to {p2}. {next_turn}'s turn."
-                )
-
-    def draw_board(self):
-        """Vẽ bàn cờ với các ô màu sắc xen kẽ."""
-        color = self.color2
-        for row in range(self.rows):
-            color = self.color1 if color == self.color2 else self.color2
-            for col in range(self.columns):
-                self.draw_square(row, col, color)
-                color = self.color1 if color == self.color2 else self.color2
-        self.update_piece_positions()
-
-    def draw_square(self, row, col, color):
-        """Vẽ một ô trên bàn cờ."""
-        x1 = (col * self.dim_square)
-        y1 = ((7 - row) * self.dim_square)
-        x2 = x1 + self.dim_square
-        y2 = y1 + self.dim_square
-        if self.focused and (row, col) in self.focused:
-            self.canvas.create_rectangle(x1, y1, x2, y2, fill=self.highlightcolor, tags="area")  # Nổi bật ô
-        else:
-            self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, tags="area")
-
-    def update_piece_positions(self):
-        """Cập nhật vị trí các quân cờ trên bàn cờ."""
-        for name in self.pieces:
-            piece_pos = self.pieces[name]
-            x0 = (piece_pos[1] * self.dim_square) + int(self.dim_square / 2)
-            y0 = ((7 - piece_pos[0]) * self.dim_square) + int(self.dim_square / 2)
-            self.canvas.coords(name, x0, y0)  # Cập nhật tọa độ quân cờ
-        self.canvas.tag_raise("occupied")  # Đưa quân cờ lên trên các ô
-        self.canvas.tag_lower("area")  # Đưa ô xuống dưới
-
-    def draw_pieces(self):
-        """Vẽ tất cả các quân cờ lên bàn cờ."""
-        self.canvas.delete("occupied")  # Xóa các quân cờ cũ
-        for xycoord, piece in self.chessboard.items():
-            x, y = self.chessboard.num_notation(xycoord)
-            if piece is not None:
-                self.create_piece_image(x, y, piece)
-
-    def create_piece_image(self, x, y, piece):
-        """Tạo hình ảnh cho quân cờ và đặt nó lên bàn cờ."""
-        filename = f"pieces_image/{piece.shortname.lower()}{piece.color}.png"
-        piece_name = f"{piece.shortname}{x}{y}"
-        if filename not in self.images:
-            self.images[filename] = ImageTk.PhotoImage(file=filename)
-
-        self.canvas.create_image(0, 0, image=self.images[filename], tags=(piece_name, "occupied"), anchor="c")
-        x0 = (y * self.dim_square) + int(self.dim_square / 2)
-        y0 = ((7 - x) * self.dim_square) + int(self.dim_square / 2)
-        self.canvas.coords(piece_name, x0, y0)
-
-    def square_clicked(self, event):
-        """Xử lý sự kiện khi nhấp vào ô cờ."""
-        col_size = row_size = self.dim_square
-        selected_column = event.x // col_size
-        selected_row = 7 - (event.y // row_size)
-        pos = self.chessboard.alpha_notation((selected_row, selected_column))
-
-        if self.selected_piece:
-            self.handle_move(self.selected_piece[1], pos)  # Di chuyển quân cờ
-            self.selected_piece = None  # Hủy quân cờ đã chọn
-            self.focused = None  # Hủy các ô có thể di chuyển
-            self.pieces = {}  # Xóa các quân cờ cũ
-            self.draw_board()  # Vẽ lại bàn cờ
-            self.draw_pieces()  # Vẽ lại quân cờ
-
-        self.focus(pos)  # Tạo hiệu ứng nổi bật cho quân cờ
-        self.draw_board()  # Vẽ lại bàn cờ
-
-    def handle_move(self, from_pos, to_pos):
-        """Xử lý việc di chuyển quân cờ từ vị trí này sang vị trí khác."""
-        piece = self.chessboard[from_pos]
-        dest_piece = self.chessboard.get(to_pos, None)
-
-        if dest_piece is None or dest_piece.color != piece.color:
-            try:
-                self.chessboard.shift(from_pos, to_pos)  # Thực hiện di chuyển
-            except ChessError:
-                pass
-
-    def focus(self, pos):
-        """Đánh dấu quân cờ đã chọn và làm nổi bật các nước đi có thể có của quân đó."""
-        piece = self.chessboard.get(pos, None)
-        if piece and piece.color == self.chessboard.player_turn:
-            self.selected_piece = (piece, pos)  # Lưu quân cờ đã chọn
-            self.focused = list(map(self.chessboard.num_notation, piece.moves_available(pos)))  # Lấy các ô có thể di chuyển
-
-    
-
-def main():
-    root = Tk()
-    root.title("Chess Game")
-    board = Board()  # Khởi tạo bàn cờ
-    gui = ChessGUI(root, board)  # Khởi tạo giao diện người dùng
-    root.mainloop()
-
-if __name__ == "__main__":
-    main()
+from tkinter import *
+from PIL import ImageTk
+from chessboard import Board, ChessError, CheckMate, Draw, START_PATTERN
+from engine import EngineWorker
+from tkinter import messagebox
+class ChessGUI:
+    selected_piece = None  # Quân cờ đã chọn
+    focused = None  # Các ô có thể di chuyển của quân cờ đã chọn
+    rows = 8  # Số hàng
+    columns = 8  # Số cột
+    color1 = "#DDB88C"  # Màu của các ô sáng
+    color2 = "#A66D4F"  # Màu của các ô tối
+    dim_square = 64  # Kích thước của mỗi ô
+    highlightcolor = "khaki"  # Màu nền của ô đang được chọn
+    poll_interval = 50  # Chu kỳ (ms) đọc kết quả từ máy cờ chạy nền
+
+    def __init__(self, parent, chessboard, engine=None):
+        """Khởi tạo giao diện người dùng cho trò chơi cờ vua."""
+        self.parent = parent
+        self.chessboard = chessboard
+        self.engine = engine  # engine.EngineWorker đã khởi động (hoặc None nếu không dùng máy cờ)
+        self.engine_request = None  # (số thứ tự công việc, "hint" hoặc "play") đang chờ máy cờ
+
+        # Khởi tạo menu
+        self.menubar = Menu(parent)
+        self.filemenu = Menu(self.menubar, tearoff=0)
+        self.filemenu.add_command(label="New Game", command=self.new_game)  # Menu "New Game"
+        self.menubar.add_cascade(label="File", menu=self.filemenu)
+        if engine is not None:
+            self.enginemenu = Menu(self.menubar, tearoff=0)
+            self.enginemenu.add_command(label="Hint", command=lambda: self.ask_engine("hint"))  # Gợi ý nước đi
+            self.enginemenu.add_command(label="Engine Move", command=lambda: self.ask_engine("play"))  # Máy đi thay
+            self.menubar.add_cascade(label="Engine", menu=self.enginemenu)
+        self.parent.config(menu=self.menubar)
+
+        # Khởi tạo thông tin ở dưới cùng
+        self.btmfrm = Frame(parent, height=64)
+        self.info_label = Label(self.btmfrm, text="   White to Start the Game", fg=self.color2)
+        self.info_label.pack(side=RIGHT, padx=8, pady=5)
+        self.btmfrm.pack(fill="x", side=BOTTOM)
+
+        self.images = {}  # Lưu trữ hình ảnh quân cờ
+        self.square_items = {}  # (hàng, cột) -> hình chữ nhật của ô trên canvas
+        self.piece_items = {}  # (hàng, cột) -> hình quân cờ của ô trên canvas
+        self.rendered = {}  # (hàng, cột) -> (màu nền, hình quân cờ) đã vẽ lần trước
+
+        # Khởi tạo canvas vẽ bàn cờ
+        canvas_width = self.columns * self.dim_square
+        canvas_height = self.rows * self.dim_square
+        self.canvas = Canvas(parent, width=canvas_width, height=canvas_height, background="grey")
+        self.canvas.pack(padx=8, pady=8)
+
+        self.draw_board()  # Vẽ bàn cờ và các quân cờ
+        self.canvas.bind("<Button-1>", self.square_clicked)  # Xử lý sự kiện khi nhấp vào ô cờ
+        if engine is not None:
+            self.parent.after(self.poll_interval, self.poll_engine)
+
+    def new_game(self):
+        """Khởi tạo lại bàn cờ và giao diện sau mỗi ván chơi mới."""
+        self.chessboard.show(START_PATTERN)  # Hiển thị trạng thái khởi đầu
+        self.cancel_engine()
+        self.selected_piece = None
+        self.focused = None
+        self.draw_board()
+        self.info_label.config(text="White to Start the Game", fg="red")  # Cập nhật thông tin
+
+    def shift(self, p1, p2):
+        """
+        Xử lý nước đi và cập nhật thông tin hiển thị.
+        p1: Vị trí ban đầu của quân cờ.
+        p2: Vị trí đích đến.
+        """
+        piece = self.chessboard.get_piece(p1)  # Lấy quân cờ tại p1
+        try:
+            dest_piece = self.chessboard.get_piece(p2)
+        except KeyError:  # Nếu vị trí đích không tồn tại
+            dest_piece = None
+
+        if dest_piece is None or dest_piece.color != piece.color:
+            try:
+                self.chessboard.shift(p1, p2)  # Thực hiện nước đi
+            except self.chessboard.ChessError as error:
+                # Hiển thị lỗi nếu nước đi không hợp lệ
+                self.info_label.config(text=f"Error: {error.__class__.__name__}")
+            else:
+                # Cập nhật thông tin về lượt đi
+                next_turn = "White" if piece.color == "black" else "Black"
+                self.info_label.config(
+                    text=f"{piece.color.capitalize()} moved {p1} to {p2}. {next_turn}'s turn."
+                )
+
+    def draw_board(self):
+        """Vẽ bàn cờ. Các ô và hình quân cờ chỉ được tạo một lần; các lần vẽ sau chỉ cập nhật
+        những ô có màu nền hoặc quân cờ thay đổi so với lần vẽ trước."""
+        if not self.square_items:
+            self.create_squares()
+        highlighted = set(self.focused or ())
+        images = {self.chessboard.num_notation(pos): self.piece_image(piece)
+                  for pos, piece in self.chessboard.items()}
+        for row in range(self.rows):
+            for col in range(self.columns):
+                if (row, col) in highlighted:
+                    fill = self.highlightcolor  # Nổi bật ô
+                else:
+                    fill = self.color1 if (row + col) % 2 == 0 else self.color2
+                self.draw_square(row, col, fill, images.get((row, col)))
+
+    def create_squares(self):
+        """Tạo 64 ô và 64 hình quân cờ (ẩn) trên canvas; số phần tử canvas không tăng thêm sau đó."""
+        half = self.dim_square // 2
+        for row in range(self.rows):
+            for col in range(self.columns):
+                x1 = col * self.dim_square
+                y1 = (7 - row) * self.dim_square
+                self.square_items[row, col] = self.canvas.create_rectangle(
+                    x1, y1, x1 + self.dim_square, y1 + self.dim_square, tags="area")
+                self.piece_items[row, col] = self.canvas.create_image(
+                    x1 + half, y1 + half, state="hidden", tags="occupied", anchor="c")
+        self.canvas.tag_raise("occupied")  # Đưa quân cờ lên trên các ô
+
+    def draw_square(self, row, col, fill, image):
+        """Cập nhật màu nền và hình quân cờ của một ô nếu khác với lần vẽ trước."""
+        fill_before, image_before = self.rendered.get((row, col), (None, None))
+        if fill != fill_before:
+            self.canvas.itemconfig(self.square_items[row, col], fill=fill)
+        if image is not image_before:
+            if image is None:
+                self.canvas.itemconfig(self.piece_items[row, col], state="hidden")
+            else:
+                self.canvas.itemconfig(self.piece_items[row, col], image=image, state="normal")
+        self.rendered[row, col] = (fill, image)
+
+    def piece_image(self, piece):
+        """Hình ảnh của quân cờ, mỗi tệp ảnh chỉ được nạp một lần."""
+        filename = f"pieces_image/{piece.shortname.lower()}{piece.color}.png"
+        if filename not in self.images:
+            self.images[filename] = ImageTk.PhotoImage(file=filename)
+        return self.images[filename]
+
+    def square_clicked(self, event):
+        """Xử lý sự kiện khi nhấp vào ô cờ."""
+        col_size = row_size = self.dim_square
+        selected_column = event.x // col_size
+        selected_row = 7 - (event.y // row_size)
+        pos = self.chessboard.alpha_notation((selected_row, selected_column))
+
+        if self.selected_piece:
+            self.handle_move(self.selected_piece[1], pos)  # Di chuyển quân cờ
+            self.selected_piece = None  # Hủy quân cờ đã chọn
+            self.focused = None  # Hủy các ô có thể di chuyển
+
+        self.focus(pos)  # Tạo hiệu ứng nổi bật cho quân cờ
+        self.draw_board()  # Chỉ vẽ lại các ô đã thay đổi
+
+    def handle_move(self, from_pos, to_pos, promotion=None):
+        """Xử lý việc di chuyển quân cờ từ vị trí này sang vị trí khác (tốt tới hàng cuối mặc định phong hậu)."""
+        piece = self.chessboard[from_pos]
+        dest_piece = self.chessboard.get(to_pos, None)
+
+        if dest_piece is None or dest_piece.color != piece.color:
+            try:
+                self.chessboard.shift(from_pos, to_pos, promotion)  # Thực hiện di chuyển
+            except (CheckMate, Draw) as error:
+                self.info_label.config(text=str(error), fg="red")  # Ván cờ đã kết thúc
+                return True
+            except ChessError:
+                pass
+            else:
+                self.cancel_engine()  # Thế cờ đã thay đổi: kết quả máy cờ đang tính không còn đúng
+                return self.show_game_over()
+        return False
+
+    def show_game_over(self):
+        """Báo kết thúc ván cờ ngay sau nước vừa đi (chiếu hết, hết nước, hòa); trả về True nếu ván đã kết thúc."""
+        board = self.chessboard
+        if not board.legal_move_map():
+            if board.king_in_check(board.player_turn):
+                winner = "White" if board.player_turn == "black" else "Black"
+                text = f"Checkmate: {winner} wins"
+            else:
+                text = "Stalemate: No valid moves available"
+        elif board.is_fifty_moves():
+            text = "Draw by the fifty-move rule"
+        elif board.is_repetition():
+            text = "Draw by threefold repetition"
+        else:
+            return False
+        self.info_label.config(text=text, fg="red")
+        return True
+
+    def ask_engine(self, purpose):
+        """Gửi thế cờ hiện tại cho máy cờ chạy nền; kết quả được xử lý trong poll_engine."""
+        job_id = self.engine.submit(self.chessboard)
+        self.engine_request = (job_id, purpose)
+        self.info_label.config(text="Engine is thinking...", fg=self.color2)
+
+    def cancel_engine(self):
+        """Hủy công việc máy cờ đang chạy (nếu có)."""
+        if self.engine is not None and self.engine_request:
+            self.engine.cancel()
+        self.engine_request = None
+
+    def poll_engine(self):
+        """Đọc kết quả máy cờ mà không chờ, rồi hẹn lần đọc tiếp theo."""
+        result = self.engine.poll()
+        if result and self.engine_request and result[0] == self.engine_request[0]:
+            purpose = self.engine_request[1]
+            self.engine_request = None
+            found = result[2]
+            if found.move is None:
+                self.info_label.config(text="No move available", fg="red")
+            elif purpose == "hint":
+                p1, p2 = found.move[:2]
+                self.selected_piece = (self.chessboard[p1], p1)
+                self.focused = [self.chessboard.num_notation(p2)]  # Chỉ nổi bật ô đích được gợi ý
+                self.info_label.config(text=f"Hint: {p1} to {p2}", fg=self.color2)
+                self.draw_board()
+            else:
+                self.selected_piece = None
+                self.focused = None
+                if not self.handle_move(*found.move):  # Giữ thông báo kết thúc ván nếu có
+                    self.info_label.config(text=f"Engine moved {found.move[0]} to {found.move[1]}", fg=self.color2)
+                self.draw_board()
+        self.parent.after(self.poll_interval, self.poll_engine)
+
+    def focus(self, pos):
+        """Đánh dấu quân cờ đã chọn và làm nổi bật các nước đi có thể có của quân đó."""
+        piece = self.chessboard.get(pos, None)
+        if piece and piece.color == self.chessboard.player_turn:
+            self.selected_piece = (piece, pos)  # Lưu quân cờ đã chọn
+            self.focused = list(map(self.chessboard.num_notation, self.chessboard.legal_moves_from(pos)))  # Các ô đi được hợp lệ (đã lưu đệm theo thế cờ)
+
+    
+
+def main():
+    root = Tk()
+    root.title("Chess Game")
+    board = Board()  # Khởi tạo bàn cờ
+    engine = EngineWorker().start()  # Máy cờ chạy trong tiến trình riêng
+    gui = ChessGUI(root, board, engine)  # Khởi tạo giao diện người dùng
+    try:
+        root.mainloop()
+    finally:
+        engine.close()
+
+if __name__ == "__main__":
+    main()
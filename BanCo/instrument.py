@@ -0,0 +1,231 @@
+# Đo đạc các đường nóng của luật cờ và máy cờ: số lần gọi và thời gian tích lũy của từng
+# hàm, số nước đi/nút kiểm tra mỗi giây, tỉ lệ trúng bộ đệm nước đi hợp lệ và bảng chuyển vị.
+#
+# Chỉ bật khi cần: enable() thay các hàm được theo dõi bằng bản bọc có đếm, disable() trả lại
+# đúng các hàm gốc, nên khi tắt không tốn thêm chi phí nào. Báo cáo xuất ra dạng JSON hoặc
+# một dòng log định kỳ.
+#
+#   python instrument.py --depth 3 --movetime 2 > report.json
+import argparse
+import functools
+import json
+import sys
+import threading
+import time
+
+import pieces
+from chessboard import Board
+from search import Searcher
+from transposition import TranspositionTable
+
+# Các hàm được theo dõi mặc định: (lớp, tên thuộc tính)
+DEFAULT_TARGETS = [
+    (Board, 'shift'),
+    (Board, 'is_in_check_after_move'),
+    (Board, 'all_moves_available'),
+    (Board, 'legal_move_map'),
+    (Board, '_legal_moves'),
+    (Board, '_pseudo_moves'),
+    (Board, '_make'),
+    (Board, '_unmake'),
+    (Board, 'king_in_check'),
+    (Board, 'san'),
+    (pieces.Piece, 'moves_available'),
+    (pieces.Piece, 'targets'),
+    (pieces.King, 'targets'),
+    (pieces.Pawn, 'targets'),
+    (Searcher, 'search'),
+]
+
+_originals = {}  # (lớp, tên) -> hàm gốc, để disable() trả lại
+_stats = {}  # tên hàm -> [số lần gọi, số giây tích lũy]
+_counters = {}  # Các bộ đếm bộ đệm và số nút tìm kiếm
+_started = None
+_logger = None  # (luồng ghi log định kỳ, Event để dừng)
+
+
+def _name(owner, attribute):
+    return f'{owner.__module__}.{owner.__qualname__}.{attribute}'
+
+
+def _timed(name, func):
+    """Bản bọc đếm số lần gọi và thời gian tích lũy (tính cả các lời gọi lồng nhau bên trong)."""
+    stats = _stats.setdefault(name, [0, 0.0])
+    clock = time.perf_counter
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats[0] += 1
+            stats[1] += clock() - start
+    return wrapper
+
+
+def _count_legal_cache(func):
+    # Bộ đệm nước đi hợp lệ trúng khi khóa đã lưu trùng khóa của thế cờ hiện tại
+    @functools.wraps(func)
+    def wrapper(board):
+        _counters['legal_cache_hits' if board._legal_key == board.zobrist_key else 'legal_cache_misses'] += 1
+        return func(board)
+    return wrapper
+
+
+def _count_tt(func):
+    @functools.wraps(func)
+    def wrapper(tt, key):
+        entry = func(tt, key)
+        _counters['tt_probes'] += 1
+        if entry is not None:
+            _counters['tt_hits'] += 1
+        return entry
+    return wrapper
+
+
+def _count_search_nodes(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        _counters['search_nodes'] += result.nodes
+        _counters['search_seconds'] += result.seconds
+        return result
+    return wrapper
+
+
+def _patch(owner, attribute, wrapper):
+    func = owner.__dict__[attribute]
+    _originals.setdefault((owner, attribute), func)
+    setattr(owner, attribute, wrapper(func))
+
+
+def reset():
+    """Đặt lại mọi bộ đếm (các hàm vẫn được theo dõi nếu đang bật)."""
+    global _started
+    for stats in _stats.values():
+        stats[0], stats[1] = 0, 0.0
+    _counters.update(legal_cache_hits=0, legal_cache_misses=0, tt_probes=0, tt_hits=0,
+                     search_nodes=0, search_seconds=0.0)
+    _started = time.perf_counter()
+
+
+def enabled():
+    return bool(_originals)
+
+
+def enable(targets=DEFAULT_TARGETS, log_interval=None, stream=sys.stderr):
+    """Bắt đầu theo dõi các hàm targets; nếu có log_interval (giây) thì ghi một dòng tóm tắt
+    ra stream sau mỗi khoảng thời gian đó."""
+    global _logger
+    if enabled():
+        disable()
+    reset()
+    for owner, attribute in targets:
+        name = _name(owner, attribute)
+        _patch(owner, attribute, lambda func, name=name: _timed(name, func))
+    _patch(Board, '_cached_legal_moves', _count_legal_cache)
+    _patch(TranspositionTable, 'probe', _count_tt)
+    _patch(Searcher, 'search', _count_search_nodes)
+    if log_interval:
+        stop = threading.Event()
+        thread = threading.Thread(target=_log_loop, args=(log_interval, stream, stop), daemon=True)
+        thread.start()
+        _logger = (thread, stop)
+
+
+def disable():
+    """Trả lại các hàm gốc; các bộ đếm được giữ nguyên để còn xuất báo cáo."""
+    global _logger
+    if _logger is not None:
+        thread, stop = _logger
+        stop.set()
+        thread.join()
+        _logger = None
+    for (owner, attribute), func in reversed(list(_originals.items())):
+        setattr(owner, attribute, func)
+    _originals.clear()
+
+
+def _rate(hits, total):
+    return hits / total if total else None
+
+
+def report():
+    """Báo cáo dạng dict (ghi ra JSON được) từ lúc enable() hoặc reset() gần nhất."""
+    elapsed = time.perf_counter() - _started if _started is not None else 0.0
+    functions = {}
+    for name, (calls, seconds) in sorted(_stats.items(), key=lambda item: -item[1][1]):
+        if calls:
+            functions[name] = {'calls': calls, 'seconds': round(seconds, 6),
+                               'us_per_call': round(seconds / calls * 1e6, 3)}
+    made = _stats.get(_name(Board, '_make'), [0])[0]
+    checked = _stats.get(_name(Board, 'king_in_check'), [0])[0]
+    legal_hits, legal_misses = _counters.get('legal_cache_hits', 0), _counters.get('legal_cache_misses', 0)
+    tt_probes, tt_hits = _counters.get('tt_probes', 0), _counters.get('tt_hits', 0)
+    search_seconds = _counters.get('search_seconds', 0.0)
+    return {
+        'elapsed': round(elapsed, 6),
+        'functions': functions,
+        'rates': {
+            'moves_made_per_second': made / elapsed if elapsed else None,
+            'checks_per_second': checked / elapsed if elapsed else None,
+            'search_nodes': _counters.get('search_nodes', 0),
+            'search_nodes_per_second': _counters.get('search_nodes', 0) / search_seconds if search_seconds else None,
+        },
+        'caches': {
+            'legal_moves': {'hits': legal_hits, 'misses': legal_misses,
+                            'hit_rate': _rate(legal_hits, legal_hits + legal_misses)},
+            'transposition': {'probes': tt_probes, 'hits': tt_hits, 'hit_rate': _rate(tt_hits, tt_probes)},
+        },
+    }
+
+
+def format_line(data=None):
+    """Một dòng log tóm tắt báo cáo."""
+    data = data or report()
+    rates, caches = data['rates'], data['caches']
+
+    def percent(value):
+        return f'{value:.1%}' if value is not None else '-'
+
+    return (f"[instrument] {data['elapsed']:.1f}s make/s={rates['moves_made_per_second'] or 0:.0f} "
+            f"check/s={rates['checks_per_second'] or 0:.0f} nps={rates['search_nodes_per_second'] or 0:.0f} "
+            f"legal-cache={percent(caches['legal_moves']['hit_rate'])} tt={percent(caches['transposition']['hit_rate'])}")
+
+
+def _log_loop(interval, stream, stop):
+    while not stop.wait(interval):
+        stream.write(format_line() + '\n')
+        stream.flush()
+
+
+def write_report(path):
+    """Ghi báo cáo JSON ra tệp path."""
+    with open(path, 'w') as f:
+        json.dump(report(), f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile move generation and search on one position.')
+    parser.add_argument('fen', nargs='?', default=None)
+    parser.add_argument('--depth', type=int, default=3, help='perft depth')
+    parser.add_argument('--movetime', type=float, default=2.0, help='search time in seconds (0 to skip)')
+    parser.add_argument('--log-interval', type=float)
+    args = parser.parse_args(argv)
+
+    board = Board(args.fen)
+    enable(log_interval=args.log_interval)
+    try:
+        board.perft(args.depth)
+        if args.movetime:
+            Searcher(board).search(movetime=args.movetime)
+    finally:
+        disable()
+    json.dump(report(), sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
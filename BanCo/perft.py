@@ -0,0 +1,148 @@
+# Bộ đo perft: đếm số nút của cây nước đi trên các thế cờ chuẩn, so với số nút đã biết
+# để kiểm tra tính đúng của bộ sinh nước đi, và đo tốc độ (nút/giây) so với mốc đã lưu.
+#
+# Tốc độ phụ thuộc máy nên mốc (perft_baseline.json, cạnh tệp này) không được đưa vào git:
+# chạy một lần với --save-baseline trên máy của mình trước khi sửa code, các lần chạy sau
+# mới có cột "vs base".
+#
+#   python perft.py --depth 3
+#   python perft.py --depth 4 --positions start endgame --save-baseline
+import argparse
+import json
+import os
+import sys
+import time
+
+import bitboard
+from chessboard import Board, move_names
+from pieces import COLOR_BITS
+
+# Các thế cờ chuẩn: (tên, FEN, số nút đúng ở độ sâu 1, 2, 3, ...)
+POSITIONS = [
+    ('start', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     [20, 400, 8902, 197281, 4865609]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603]),
+    ('endgame', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624]),
+    ('promotion', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333]),
+    ('middlegame', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487]),
+]
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perft_baseline.json')
+
+
+def perft(board, depth):
+    """Số nút lá ở độ sâu depth tính từ thế cờ hiện tại của board."""
+    return board.perft(depth)
+
+
+def perft_bitboard(board, depth):
+    """Như perft nhưng sinh nước đi bằng bitboard, dùng để đối chiếu hai bộ sinh nước đi."""
+    if depth == 0:
+        return 1
+    bit = COLOR_BITS[board.player_turn]
+    color = board.player_turn
+    nodes = 0
+    for frm, to, promotion in bitboard.Bitboards(board).moves(bit):
+        board._make(bitboard.to_0x88(frm), bitboard.to_0x88(to), promotion)
+        if not board.king_in_check(color):
+            nodes += perft_bitboard(board, depth - 1)
+        board._unmake()
+    return nodes
+
+
+def divide(board, depth):
+    """Số nút dưới từng nước đi ở gốc, giúp tìm nước đi bị sinh sai."""
+    result = {}
+    for move in board._legal_moves(COLOR_BITS[board.player_turn]):
+        board._make(*move)
+        result[''.join(move_names(move))] = board.perft(depth - 1) if depth > 1 else 1
+        board._unmake()
+    return result
+
+
+ENGINES = {'board': perft, 'bitboard': perft_bitboard}
+
+
+def run(depth, names=None, engine='board'):
+    """Chạy perft trên các thế cờ chuẩn đến độ sâu depth, trả về danh sách kết quả."""
+    board = Board()
+    count = ENGINES[engine]
+    results = []
+    for name, fen, expected in POSITIONS:
+        if names and name not in names:
+            continue
+        for d in range(1, min(depth, len(expected)) + 1):
+            board.show(fen)
+            start = time.perf_counter()
+            nodes = count(board, d)
+            elapsed = time.perf_counter() - start
+            results.append({
+                'position': name,
+                'depth': d,
+                'nodes': nodes,
+                'expected': expected[d - 1],
+                'seconds': elapsed,
+                'nps': nodes / elapsed if elapsed > 0 else 0.0,
+            })
+    return results
+
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    baseline = load_baseline(path)
+    for r in results:
+        baseline[f"{r['position']}/{r['depth']}"] = {'nodes': r['nodes'], 'nps': r['nps']}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def report(results, baseline):
+    """In bảng kết quả; trả về False nếu có số nút sai."""
+    ok = True
+    print(f"{'position':<12}{'depth':>6}{'nodes':>12}{'expected':>12}{'nodes/s':>12}{'vs base':>10}")
+    for r in results:
+        correct = r['nodes'] == r['expected']
+        ok = ok and correct
+        base = baseline.get(f"{r['position']}/{r['depth']}")
+        change = f"{(r['nps'] / base['nps'] - 1) * 100:+.1f}%" if base and base['nps'] else '-'
+        print(f"{r['position']:<12}{r['depth']:>6}{r['nodes']:>12}{r['expected']:>12}"
+              f"{r['nps']:>12.0f}{change:>10}{'' if correct else '  MISMATCH'}")
+    total_nodes = sum(r['nodes'] for r in results)
+    total_time = sum(r['seconds'] for r in results)
+    if total_time:
+        print(f"total: {total_nodes} nodes in {total_time:.2f}s ({total_nodes / total_time:.0f} nodes/s)")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perft correctness and throughput benchmark.')
+    parser.add_argument('--depth', type=int, default=3, help='maximum depth per position')
+    parser.add_argument('--positions', nargs='*', help='subset of position names to run')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='board')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    args = parser.parse_args(argv)
+
+    results = run(args.depth, args.positions, args.engine)
+    baseline = load_baseline(args.baseline)
+    ok = report(results, baseline)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f'baseline saved to {args.baseline}')
+    elif not baseline:
+        print(f'no baseline at {args.baseline}; run with --save-baseline to record one')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# Đọc/ghi ván cờ dạng PGN. Bộ đọc là generator xử lý từng dòng nên bộ nhớ không phụ thuộc
+# kích thước tệp; mỗi ván chỉ giữ phần tiêu đề và đoạn văn bản nước đi của nó, danh sách
+# nước đi SAN được tách và đi lại trên Board chỉ khi được yêu cầu.
+import re
+
+from chessboard import START_PATTERN, Board
+
+STANDARD_START = START_PATTERN
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+SEVEN_TAG_ROSTER = ('Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result')
+
+HEADER_PATTERN = re.compile(r'^\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]$')
+# Chú thích {...} hoặc ; đến hết dòng, NAG ($n) và số thứ tự nước đi (12. hoặc 12...)
+COMMENT_PATTERN = re.compile(r'\{[^}]*\}|;[^\n]*|\$\d+')
+MOVE_NUMBER_PATTERN = re.compile(r'^\d+\.+')
+
+
+class Game:
+    """Một ván cờ đọc từ PGN: tiêu đề và văn bản nước đi chưa được phân tích."""
+
+    def __init__(self, headers, movetext):
+        self.headers = headers
+        self.movetext = movetext
+
+    @property
+    def result(self):
+        return self.headers.get('Result', '*')
+
+    def iter_moves(self):
+        """Duyệt lần lượt các nước đi SAN của nhánh chính (bỏ qua chú thích và biến thể)."""
+        text = COMMENT_PATTERN.sub(' ', self.movetext)
+        depth = 0  # Độ sâu lồng nhau của biến thể (...)
+        for token in text.replace('(', ' ( ').replace(')', ' ) ').split():
+            if token == '(':
+                depth += 1
+            elif token == ')':
+                depth -= 1
+            elif depth == 0 and token not in RESULTS:
+                token = MOVE_NUMBER_PATTERN.sub('', token)
+                if token:
+                    yield token
+
+    @property
+    def moves(self):
+        return list(self.iter_moves())
+
+    def replay(self, board=None):
+        """Đi lại ván cờ trên board (hoặc một Board mới), trả về từng (SAN, board) sau mỗi nước."""
+        board = board if board is not None else Board()
+        board.show(self.headers.get('FEN', STANDARD_START))
+        for san in self.iter_moves():
+            board.push_san(san)
+            yield san, board
+
+    def final_board(self, board=None):
+        """Đi hết ván cờ và trả về bàn cờ ở thế cuối."""
+        board = board if board is not None else Board()
+        for _ in self.replay(board):
+            pass
+        return board
+
+
+def read_games(stream):
+    """Đọc lần lượt các ván cờ từ một luồng văn bản PGN (generator). Các dòng nước đi được
+    nối bằng xuống dòng để chú thích ; chỉ kéo dài đến hết dòng của nó."""
+    headers, movetext = {}, []
+    for line in stream:
+        line = line.strip()
+        if line.startswith('[') and line.endswith(']'):
+            if movetext:  # Ván trước không có kết quả ở cuối
+                yield Game(headers, '\n'.join(movetext))
+                headers, movetext = {}, []
+            match = HEADER_PATTERN.match(line)
+            if match:
+                headers[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+        elif line and not line.startswith('%'):
+            movetext.append(line)
+            if line.split()[-1] in RESULTS and line.count('{') <= line.count('}'):
+                yield Game(headers, '\n'.join(movetext))
+                headers, movetext = {}, []
+    if headers or movetext:
+        yield Game(headers, '\n'.join(movetext))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def start_fen(board):
+    """FEN của thế cờ trước các nước trong board.history, tìm bằng cách hoàn tác các nước đó
+    rồi đi lại (board trở về nguyên trạng)."""
+    moves = [entry[:3] for entry in board._undo[len(board._undo) - len(board.history):]]
+    for _ in moves:
+        board._unmake()
+    fen = board.fen()
+    for move in moves:
+        board._make(*move)
+    return fen
+
+
+def game_text(board, headers=None, result='*'):
+    """Tạo văn bản PGN cho các nước đi trong board.history; ván không bắt đầu từ thế cờ
+    chuẩn có thêm tiêu đề SetUp và FEN."""
+    tags = {name: '?' for name in SEVEN_TAG_ROSTER}
+    if len(board._undo) >= len(board.history):
+        fen = start_fen(board)
+        if fen != STANDARD_START:
+            tags.update(SetUp='1', FEN=fen)
+    tags.update(headers or {})
+    tags['Result'] = result
+    lines = [f'[{name} "{_escape(value)}"]' for name, value in tags.items()]
+    lines.append('')
+
+    # Tính lại nửa nước bắt đầu từ thế cờ hiện tại và số nước trong lịch sử
+    ply = 2 * (board.fullmove_number - 1) + (board.player_turn == 'black') - len(board.history)
+    tokens = []
+    for san in board.history:
+        if ply % 2 == 0:
+            tokens.append(f'{ply // 2 + 1}.')
+        elif not tokens:
+            tokens.append(f'{ply // 2 + 1}...')
+        tokens.append(san)
+        ply += 1
+    tokens.append(result)
+
+    # Gói dòng ở 80 ký tự
+    line = ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 80:
+            lines.append(line)
+            line = token
+        else:
+            line = f'{line} {token}' if line else token
+    lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def write_game(out, board, headers=None, result='*'):
+    """Ghi ván cờ của board ra luồng out theo định dạng PGN."""
+    out.write(game_text(board, headers, result))
+    out.write('\n')
+
@@ -1,148 +1,155 @@
-import sys
-
-class Piece:
-    def __init__(self, color):
-        self.color = color  # Màu quân cờ (đen hoặc trắng)
-        self.board = None  # Bàn cờ, khởi tạo là None
-        self.shortname = self.shortname.lower() if color == 'black' else self.shortname.upper()  # Chữ cái đại diện quân cờ (ví dụ: 'K' cho vua, 'Q' cho hậu)
-
-    def place(self, board):
-        """Gán bàn cờ cho quân cờ."""
-        self.board = board
-
-    def ref(self, board):
-        """Cập nhật lại bàn cờ cho quân cờ."""
-        self.board = board
-
-    def moves_available(self, pos):
-        """Hàm này phải được cài đặt ở các lớp con để tính toán nước đi hợp lệ của quân cờ."""
-        raise NotImplementedError("This method should be implemented in subclasses.")
-
-    def _calculate_moves(self, pos, diagonal, orthogonal, distance):
-        """Tính toán nước đi của quân cờ dựa trên loại quân và hướng đi."""
-        board = self.board
-        allowed_moves = []
-        orthogonal_moves = ((-1, 0), (0, -1), (0, 1), (1, 0))  # Các hướng đi theo chiều dọc và ngang
-        diagonal_moves = ((-1, -1), (-1, 1), (1, -1), (1, 1))  # Các hướng đi chéo
-        beginning_pos = board.num_notation(pos.upper())  # Chuyển đổi vị trí thành tọa độ trên bàn cờ
-
-        directions = []
-        if orthogonal and diagonal:
-            directions = diagonal_moves + orthogonal_moves  # Cả hai hướng
-        elif diagonal:
-            directions = diagonal_moves  # Chỉ chéo
-        elif orthogonal:
-            directions = orthogonal_moves  # Chỉ dọc và ngang
-
-        # Tính toán các nước đi hợp lệ
-        for x, y in directions:
-            collision = False
-            for step in range(1, distance + 1):
-                if collision:
-                    break
-                dest = (beginning_pos[0] + step * x, beginning_pos[1] + step * y)
-                dest_notation = board.alpha_notation(dest)
-                if dest_notation not in board.occupied('white') + board.occupied('black'):
-                    allowed_moves.append(dest)
-                elif dest_notation in board.occupied(self.color):
-                    collision = True
-                else:
-                    allowed_moves.append(dest)
-                    collision = True
-
-        allowed_moves = filter(board.is_on_board, allowed_moves)  # Lọc ra các nước đi hợp lệ
-        return list(map(board.alpha_notation, allowed_moves))  # Trả về các nước đi hợp lệ dưới dạng ký hiệu bàn cờ
-
-class King(Piece):
-    shortname = 'k'
-
-    def moves_available(self, pos):
-        return self._calculate_moves(pos, True, True, 1)  # Vua có thể di chuyển 1 ô theo mọi hướng (dọc, ngang, chéo)
-
-class Queen(Piece):
-    shortname = 'q'
-
-    def moves_available(self, pos):
-        return self._calculate_moves(pos, True, True, 8)  # Hậu có thể di chuyển 8 ô theo mọi hướng (dọc, ngang, chéo)
-
-class Rook(Piece):
-    shortname = 'r'
-
-    def moves_available(self, pos):
-        return self._calculate_moves(pos, False, True, 8)  # Xe có thể di chuyển 8 ô theo chiều dọc và ngang
-    
-class Bishop(Piece):
-    shortname = 'b'
-
-    def moves_available(self, pos):
-        return self._calculate_moves(pos, True, False, 8)  # Tượng có thể di chuyển 8 ô theo hướng chéo
-
-class Knight(Piece):
-    shortname = 'n'
-
-    def moves_available(self, pos):
-        allowed_moves = []
-        board = self.board
-        beginning_pos = board.num_notation(pos.upper())
-        piece = board.get(pos.upper())
-
-        changes = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]  # Các nước đi hình chữ "L" của mã
-
-        for x, y in changes:
-            dest = (beginning_pos[0] + x, beginning_pos[1] + y)
-            if board.alpha_notation(dest) not in board.occupied(piece.color):
-                allowed_moves.append(dest)
-
-        allowed_moves = filter(board.is_on_board, allowed_moves)  # Lọc ra các nước đi hợp lệ
-        return list(map(board.alpha_notation, allowed_moves))  # Trả về các nước đi hợp lệ
-
-
-class Pawn(Piece):
-    shortname = 'p'
-
-    def moves_available(self, pos):
-        allowed_moves = []
-        board = self.board
-        piece = self
-
-        direction, enemy = (1, 'black') if self.color == 'white' else (-1, 'white')  # Tốt di chuyển lên hoặc xuống tùy vào màu
-        start_row = 1 if self.color == 'white' else 6  # Tốt có thể di chuyển 2 ô từ vị trí ban đầu
-        prohibited = board.occupied('white') + board.occupied('black')  # Các ô đã bị chiếm
-        beginning_pos = board.num_notation(pos.upper())
-
-        forward = (beginning_pos[0] + direction, beginning_pos[1])
-        if board.alpha_notation(forward) not in prohibited:
-            allowed_moves.append(forward)
-
-            if beginning_pos[0] == start_row:
-                double_forward = (forward[0] + direction, forward[1])
-                if board.alpha_notation(double_forward) not in prohibited:
-                    allowed_moves.append(double_forward)
-
-        # Tính toán các nước đi tấn công (chéo)
-        for a in [-1, 1]:
-            attack = (beginning_pos[0] + direction, beginning_pos[1] + a)
-            if board.alpha_notation(attack) in board.occupied(enemy):
-                allowed_moves.append(attack)
-
-        allowed_moves = filter(board.is_on_board, allowed_moves)  # Lọc ra các nước đi hợp lệ
-        return list(map(board.alpha_notation, allowed_moves))  # Trả về các nước đi hợp lệ
-
-# Từ điển ánh xạ tên quân cờ viết tắt sang tên đầy đủ
-SHORT_NAME = {
-    'R': 'Rook',  # Xe
-    'N': 'Knight',  # Mã
-    'B': 'Bishop',  # Tượng
-    'Q': 'Queen',  # Hậu
-    'K': 'King',  # Vua
-    'P': 'Pawn'  # Tốt
-}
-
-def create_piece(piece, color='white'):
-    """Tạo một đối tượng quân cờ dựa trên tên viết tắt và màu sắc."""
-    if piece in (None, ''):
-        return None  # Nếu không có quân cờ, trả về None
-    color = 'white' if piece.isupper() else 'black'  # Xác định màu quân cờ
-    piece_name = SHORT_NAME.get(piece.upper())  # Lấy tên đầy đủ của quân cờ từ từ điển SHORT_NAME
-    module = sys.modules[__name__]  # Lấy module hiện tại
-    return module.__dict__[piece_name](color)  # Trả về đối tượng quân cờ
+import sys
+from squares import SQUARE_INDEX, SQUARE_NAMES, ORTHOGONAL, DIAGONAL, KNIGHT_OFFSETS
+
+# Mã quân cờ lưu trong mảng bàn cờ: 3 bit thấp là loại quân, bit 8 là màu đen
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+WHITE, BLACK = 0, 8
+COLOR_BITS = {'white': WHITE, 'black': BLACK}
+COLOR_NAMES = {WHITE: 'white', BLACK: 'black'}
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)  # Các loại quân tốt được phong cấp thành
+
+# Quyền nhập thành: 4 bit theo thứ tự K, Q, k, q của FEN; quyền của màu bit nằm ở
+# (castling >> (bit >> 2)) & 3, bit 1 là cánh vua, bit 2 là cánh hậu
+KINGSIDE, QUEENSIDE = 1, 2
+CASTLING_LETTERS = 'KQkq'
+KING_HOME = {WHITE: 0x04, BLACK: 0x74}  # Ô ban đầu của vua (E1, E8)
+
+class Piece:
+    kind = None  # Loại quân (PAWN, KNIGHT, ...)
+    directions = ()  # Các hướng đi trên mảng 0x88
+    distance = 8  # Số bước tối đa theo mỗi hướng
+
+    def __init__(self, color):
+        self.color = color  # Màu quân cờ (đen hoặc trắng)
+        self.board = None  # Bàn cờ, khởi tạo là None
+        self.shortname = self.shortname.lower() if color == 'black' else self.shortname.upper()  # Chữ cái đại diện quân cờ (ví dụ: 'K' cho vua, 'Q' cho hậu)
+        self.code = self.kind | COLOR_BITS[color]  # Mã quân cờ trong mảng bàn cờ
+
+    def place(self, board):
+        """Gán bàn cờ cho quân cờ."""
+        self.board = board
+
+    def ref(self, board):
+        """Cập nhật lại bàn cờ cho quân cờ."""
+        self.board = board
+
+    def moves_available(self, pos):
+        """Trả về các ô mà quân cờ tại pos có thể đi tới (dạng ký hiệu bàn cờ)."""
+        targets = self.targets(self.board.squares, SQUARE_INDEX[pos.upper()])
+        return [SQUARE_NAMES[to] for to in targets]
+
+    def targets(self, squares, sq):
+        """Tính các ô đích (chỉ số 0x88) của quân cờ tại sq theo hướng và khoảng cách của loại quân."""
+        color = self.code & BLACK
+        allowed_moves = []
+        for step in self.directions:
+            to = sq + step
+            remaining = self.distance
+            while remaining and not to & 0x88:
+                target = squares[to]
+                if target:
+                    if target & BLACK != color:
+                        allowed_moves.append(to)  # Ăn quân đối phương rồi dừng lại
+                    break
+                allowed_moves.append(to)
+                to += step
+                remaining -= 1
+        return allowed_moves
+
+class King(Piece):
+    shortname = 'k'
+    kind = KING
+    directions = DIAGONAL + ORTHOGONAL
+    distance = 1  # Vua có thể di chuyển 1 ô theo mọi hướng (dọc, ngang, chéo)
+
+    def targets(self, squares, sq):
+        allowed_moves = Piece.targets(self, squares, sq)
+        color = self.code & BLACK
+        rights = (self.board.castling >> (color >> 2)) & 3
+        if rights and sq == KING_HOME[color]:
+            # Nhập thành: các ô giữa vua và xe trống, vua không bị chiếu và không đi qua ô bị tấn công
+            # (ô đích được kiểm tra như mọi nước đi khác khi lọc nước đi hợp lệ)
+            enemy = color ^ BLACK
+            attacked = self.board._is_attacked
+            rook = ROOK | color
+            if rights & KINGSIDE and not squares[sq + 1] and not squares[sq + 2] and squares[sq + 3] == rook \
+                    and not attacked(sq, enemy) and not attacked(sq + 1, enemy):
+                allowed_moves.append(sq + 2)
+            if rights & QUEENSIDE and not squares[sq - 1] and not squares[sq - 2] and not squares[sq - 3] \
+                    and squares[sq - 4] == rook and not attacked(sq, enemy) and not attacked(sq - 1, enemy):
+                allowed_moves.append(sq - 2)
+        return allowed_moves
+
+class Queen(Piece):
+    shortname = 'q'
+    kind = QUEEN
+    directions = DIAGONAL + ORTHOGONAL  # Hậu có thể di chuyển 8 ô theo mọi hướng (dọc, ngang, chéo)
+
+class Rook(Piece):
+    shortname = 'r'
+    kind = ROOK
+    directions = ORTHOGONAL  # Xe có thể di chuyển 8 ô theo chiều dọc và ngang
+
+class Bishop(Piece):
+    shortname = 'b'
+    kind = BISHOP
+    directions = DIAGONAL  # Tượng có thể di chuyển 8 ô theo hướng chéo
+
+class Knight(Piece):
+    shortname = 'n'
+    kind = KNIGHT
+    directions = KNIGHT_OFFSETS  # Các nước đi hình chữ "L" của mã
+    distance = 1
+
+
+class Pawn(Piece):
+    shortname = 'p'
+    kind = PAWN
+
+    def targets(self, squares, sq):
+        allowed_moves = []
+        color = self.code & BLACK
+        step = -16 if color else 16  # Tốt di chuyển lên hoặc xuống tùy vào màu
+        start_row = 6 if color else 1  # Tốt có thể di chuyển 2 ô từ vị trí ban đầu
+
+        forward = sq + step
+        if not forward & 0x88 and not squares[forward]:
+            allowed_moves.append(forward)
+
+            if sq >> 4 == start_row and not squares[forward + step]:
+                allowed_moves.append(forward + step)
+
+        # Tính toán các nước đi tấn công (chéo), kể cả bắt tốt qua đường
+        en_passant = self.board.ep_square
+        if en_passant is not None and en_passant >> 4 != (2 if color else 5):
+            en_passant = None  # Ô bắt tốt qua đường chỉ dành cho tốt của bên đối diện
+        for attack in (forward - 1, forward + 1):
+            if attack & 0x88:
+                continue
+            if squares[attack] and squares[attack] & BLACK != color or attack == en_passant:
+                allowed_moves.append(attack)
+
+        return allowed_moves
+
+# Từ điển ánh xạ tên quân cờ viết tắt sang tên đầy đủ
+SHORT_NAME = {
+    'R': 'Rook',  # Xe
+    'N': 'Knight',  # Mã
+    'B': 'Bishop',  # Tượng
+    'Q': 'Queen',  # Hậu
+    'K': 'King',  # Vua
+    'P': 'Pawn'  # Tốt
+}
+
+def create_piece(piece, color='white'):
+    """Tạo một đối tượng quân cờ dựa trên tên viết tắt và màu sắc."""
+    if piece in (None, ''):
+        return None  # Nếu không có quân cờ, trả về None
+    color = 'white' if piece.isupper() else 'black'  # Xác định màu quân cờ
+    piece_name = SHORT_NAME.get(piece.upper())  # Lấy tên đầy đủ của quân cờ từ từ điển SHORT_NAME
+    module = sys.modules[__name__]  # Lấy module hiện tại
+    return module.__dict__[piece_name](color)  # Trả về đối tượng quân cờ
+
+# Ánh xạ giữa ký tự FEN và mã quân cờ
+CODE_OF = {letter: create_piece(letter).code for letter in 'PNBRQKpnbrqk'}
+LETTER_OF = {code: letter for letter, code in CODE_OF.items()}
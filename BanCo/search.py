@@ -0,0 +1,243 @@
+# Bộ tìm nước đi: negamax alpha-beta với lặp sâu dần, giới hạn thời gian/số nút,
+# sắp xếp nước đi (nước trong bảng chuyển vị, MVV-LVA, killer, history) và tìm kiếm
+# tĩnh (quiescence) trên các nước ăn quân.
+import time
+from collections import namedtuple
+
+from chessboard import move_names
+from evaluation import PIECE_VALUES, evaluate
+from pieces import COLOR_BITS
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+INFINITY = 1000000
+MATE = 100000  # Điểm chiếu hết; MATE - n nghĩa là chiếu hết sau n nửa nước
+MAX_PLY = 64
+
+# Kết quả tìm kiếm: nước đi tốt nhất ('E2', 'E4'), điểm (theo bên đi), độ sâu đã xong,
+# số nút đã duyệt, biến chính (danh sách nước đi) và thời gian (giây)
+SearchResult = namedtuple('SearchResult', 'move score depth nodes pv seconds')
+
+
+class _Stopped(Exception):
+    """Hết thời gian, hết số nút hoặc có yêu cầu dừng."""
+
+
+class Searcher:
+    """Tìm nước đi tốt nhất trên một Board; bàn cờ được đi/hoàn tác tại chỗ và trả về
+    nguyên trạng sau khi tìm xong."""
+
+    def __init__(self, board, tt=None, evaluate=evaluate, tablebase=None):
+        self.board = board
+        self.tt = tt if tt is not None else TranspositionTable(1 << 18)
+        self.evaluate = evaluate
+        self.tablebase = tablebase  # tablebase.Tablebase để tra các thế tàn cuộc ít quân
+        self.history = [0] * (128 * 128)  # Điểm history theo (từ, đến)
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.pv = [[] for _ in range(MAX_PLY + 1)]
+        self.nodes = 0
+        self.node_limit = None
+        self.deadline = None
+        self.stop_event = None
+        self.root_best = None  # (nước đi, điểm) tốt nhất đã tính xong ở gốc trong lần tìm hiện tại
+        self.root_moves = None  # Nếu có: tập nước đi dạng tên được phép xét ở gốc
+
+    def search(self, depth=MAX_PLY, movetime=None, nodes=None, stop_event=None, callback=None, moves=None):
+        """Tìm kiếm lặp sâu dần đến độ sâu depth, trong movetime giây hoặc nodes nút.
+        stop_event (threading.Event) cho phép dừng từ bên ngoài; callback nhận
+        SearchResult sau mỗi độ sâu hoàn thành; moves (các nước dạng ('E2', 'E4')) giới hạn
+        các nước được xét ở gốc."""
+        board = self.board
+        start = time.perf_counter()
+        self.deadline = start + movetime if movetime else None
+        self.node_limit = nodes
+        self.stop_event = stop_event
+        self.nodes = 0
+        self.tt.new_search()
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.root_best = None
+        self.root_moves = set(map(tuple, moves)) if moves else None
+        undo_depth = len(board._undo)
+
+        result = SearchResult(None, 0, 0, 0, [], 0.0)
+        for d in range(1, min(depth, MAX_PLY) + 1):
+            try:
+                score = self._negamax(d, -INFINITY, INFINITY, 0)
+            except _Stopped:
+                while len(board._undo) > undo_depth:  # Trả bàn cờ về thế cờ gốc
+                    board._unmake()
+                if result.move is None and self.root_best is not None:
+                    # Chưa xong độ sâu nào: dùng nước tốt nhất đã tính được ở gốc để luôn có nước đi
+                    move, score = self.root_best
+                    result = SearchResult(move_names(move), score, d, self.nodes, [move_names(move)],
+                                          time.perf_counter() - start)
+                break
+            pv = [move_names(move) for move in self.pv[0]]
+            result = SearchResult(pv[0] if pv else None, score, d, self.nodes, pv,
+                                  time.perf_counter() - start)
+            if callback is not None:
+                callback(result)
+            if not pv or abs(score) >= MATE - MAX_PLY:
+                break  # Không còn nước đi, hoặc đã tìm thấy chiếu hết
+            if self.deadline and time.perf_counter() - start > (self.deadline - start) / 2:
+                break  # Độ sâu tiếp theo gần như chắc chắn không kịp xong
+        return result._replace(nodes=self.nodes, seconds=time.perf_counter() - start)
+
+    def _check_limits(self):
+        if self.root_best is None:
+            return  # Phải tính xong ít nhất một nước ở gốc trước khi dừng
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise _Stopped
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise _Stopped
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise _Stopped
+
+    def _order(self, moves, tt_move, ply):
+        """Sắp xếp nước đi: nước trong bảng chuyển vị, ăn quân theo MVV-LVA, killer, history."""
+        squares = self.board.squares
+        killers = self.killers[ply]
+        history = self.history
+        keyed = []
+        for move in moves:
+            frm, to, promotion = move
+            victim = squares[to]
+            if move == tt_move:
+                key = 1 << 30
+            elif victim or promotion:
+                # Quân bị ăn (và quân được phong) càng giá trị, quân ăn càng rẻ thì càng được xét trước
+                key = (1 << 24) + (PIECE_VALUES[victim & 7] + PIECE_VALUES[promotion]) * 8 - (squares[frm] & 7)
+            elif move == killers[0]:
+                key = (1 << 23) + 1
+            elif move == killers[1]:
+                key = 1 << 23
+            else:
+                key = history[frm << 7 | to]
+            keyed.append((key, move))
+        keyed.sort(reverse=True)
+        return [move for _, move in keyed]
+
+    def _negamax(self, depth, alpha, beta, ply):
+        board = self.board
+        self.nodes += 1
+        if not self.nodes & 63:
+            self._check_limits()
+        self.pv[ply] = []
+        if ply and (board.halfmove_clock >= 100 or board.is_repetition(2)):
+            return 0  # Hòa: một lần lặp lại trong cây tìm kiếm là đủ, bên nào cũng lặp lại được
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiesce(alpha, beta, ply)
+
+        if ply and self.tablebase is not None:
+            found = self.tablebase.probe(board)
+            if found is not None:
+                result, plies = found
+                if result > 0:
+                    return MATE - ply - plies
+                return -MATE + ply + plies if result < 0 else 0
+
+        key = board.zobrist_key
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry[4]
+            if ply and entry[1] >= depth:
+                value = _from_tt(entry[2], ply)
+                flag = entry[3]
+                if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                    return value
+
+        color = board.player_turn
+        original_alpha = alpha
+        best, best_move = -INFINITY, None
+        legal = 0
+        for move in self._order(board._pseudo_moves(COLOR_BITS[color]), tt_move, ply):
+            if not ply:
+                if self.root_moves is not None and move_names(move) not in self.root_moves:
+                    continue
+                self._check_limits()  # Ở gốc kiểm tra trước mỗi nước để giới hạn được tôn trọng sát hơn
+            capture = board.squares[move[1]] or move[2]  # Ăn quân hoặc phong cấp
+            board._make(*move)
+            if board.king_in_check(color):
+                board._unmake()
+                continue
+            legal += 1
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            board._unmake()
+            if score > best:
+                best, best_move = score, move
+                if not ply:
+                    self.root_best = (move, score)
+                if score > alpha:
+                    alpha = score
+                    self.pv[ply] = [move] + self.pv[ply + 1]
+                    if alpha >= beta:
+                        if not capture:
+                            # Nước đi yên lặng gây cắt tỉa: ghi nhớ cho các nút cùng tầng
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1], killers[0] = killers[0], move
+                            self.history[move[0] << 7 | move[1]] += depth * depth
+                        break
+
+        if not legal:
+            # Không còn nước đi hợp lệ: bị chiếu hết hoặc hết nước (hòa)
+            return -MATE + ply if board.king_in_check(color) else 0
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, _to_tt(best, ply), flag, best_move)
+        return best
+
+    def _quiesce(self, alpha, beta, ply):
+        """Chỉ xét các nước ăn quân cho đến khi thế cờ yên tĩnh, tránh hiệu ứng đường chân trời."""
+        board = self.board
+        self.nodes += 1
+        if not self.nodes & 63:
+            self._check_limits()
+        stand_pat = self.evaluate(board)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        color = board.player_turn
+        squares = board.squares
+        captures = [move for move in board._pseudo_moves(COLOR_BITS[color]) if squares[move[1]] or move[2]]
+        for move in self._order(captures, None, ply):
+            board._make(*move)
+            if board.king_in_check(color):
+                board._unmake()
+                continue
+            score = -self._quiesce(-beta, -alpha, ply + 1)
+            board._unmake()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+
+def _to_tt(score, ply):
+    # Điểm chiếu hết lưu trong bảng tính từ nút hiện tại, không phụ thuộc độ sâu từ gốc
+    if score >= MATE - MAX_PLY:
+        return score + ply
+    if score <= -MATE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def _from_tt(score, ply):
+    if score >= MATE - MAX_PLY:
+        return score - ply
+    if score <= -MATE + MAX_PLY:
+        return score + ply
+    return score
+
+
+def search(board, depth=MAX_PLY, movetime=None, nodes=None, **kwargs):
+    """Tìm nước đi tốt nhất cho bên đang đi trên board; trả về SearchResult."""
+    return Searcher(board).search(depth=depth, movetime=movetime, nodes=nodes, **kwargs)
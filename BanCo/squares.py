@@ -0,0 +1,20 @@
+# Hình học bàn cờ dạng 0x88: ô (hàng, cột) có chỉ số hàng * 16 + cột.
+# Một chỉ số có bit 0x88 bật là nằm ngoài bàn cờ, nên việc kiểm tra biên
+# chỉ tốn một phép AND thay vì so sánh hai tọa độ.
+
+FILES = 'ABCDEFGH'  # Tên các cột
+
+# 64 chỉ số hợp lệ theo thứ tự A1, B1, ..., H8
+SQUARES = tuple(row << 4 | col for row in range(8) for col in range(8))
+
+# Bảng tra tên ô theo chỉ số (None với chỉ số nằm ngoài bàn cờ) và ngược lại
+SQUARE_NAMES = [None] * 128
+for _sq in SQUARES:
+    SQUARE_NAMES[_sq] = FILES[_sq & 7] + str((_sq >> 4) + 1)
+SQUARE_INDEX = {SQUARE_NAMES[_sq]: _sq for _sq in SQUARES}
+del _sq
+
+# Các bước dịch chuyển trên mảng 0x88
+ORTHOGONAL = (16, -16, 1, -1)  # Dọc và ngang
+DIAGONAL = (17, 15, -15, -17)  # Chéo
+KNIGHT_OFFSETS = (33, 31, 18, 14, -14, -18, -31, -33)  # Hình chữ "L" của mã
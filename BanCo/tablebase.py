@@ -0,0 +1,451 @@
+# Bảng tàn cuộc cho các thế cờ ít quân (3-4 quân), sinh bằng phân tích ngược (retrograde):
+# từ các thế chiếu hết lan ngược về các thế cờ đi trước nó. Mỗi bộ quân (ví dụ 'KQK',
+# 'KRKP': quân trắng rồi quân đen) có một mảng giá trị, chỉ số tính trực tiếp từ vị trí
+# các quân sau khi rút gọn đối xứng, nên tra cứu là O(1).
+#
+# Giá trị theo góc nhìn bên đang đi: 0 hòa, n > 0 thắng (chiếu hết sau n nửa nước),
+# n < 0 thua (bị chiếu hết sau -n - 1 nửa nước); ILLEGAL đánh dấu thế cờ không hợp lệ.
+# Thế cờ trong bảng không có quyền nhập thành và không tính quyền bắt tốt qua đường.
+#
+#   python tablebase.py generate KQK KRK KPK KRKP --dir tables --workers 4
+import argparse
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import (DIAGONAL_RAYS, KING_ATTACKS, KNIGHT_ATTACKS, ORTHOGONAL_RAYS, iter_bits,
+                      sliding_attacks, to_0x88, to_64)
+from chessboard import Board
+from pieces import BISHOP, BLACK, CODE_OF, KING, KNIGHT, PAWN, ROOK
+from squares import SQUARES
+
+DRAW = 0
+ILLEGAL = -0x8000
+UNKNOWN = 0x7FFF  # Chỉ dùng trong lúc sinh bảng
+MAX_PIECES = 4
+
+# Thứ tự quân trong chữ ký bộ quân và độ mạnh dùng để chọn bên "trắng" chuẩn
+ORDER = 'KQRBNP'
+STRENGTH = {'K': 0, 'Q': 9, 'R': 5, 'B': 3, 'N': 3, 'P': 1}
+
+# Tam giác a1-d1-d4: vị trí chuẩn của vua trắng khi không có tốt (đối xứng 8 chiều)
+TRIANGLE = [sq for sq in range(64) if (sq >> 3) <= (sq & 7) <= 3]
+TRIANGLE_INDEX = {sq: i for i, sq in enumerate(TRIANGLE)}
+# Khi có tốt chỉ được lật ngang: vua trắng ở các cột a-d
+HALF = [sq for sq in range(64) if sq & 7 <= 3]
+HALF_INDEX = {sq: i for i, sq in enumerate(HALF)}
+
+
+def _transform(flip_files, flip_ranks, mirror):
+    table = []
+    for sq in range(64):
+        sq ^= (7 if flip_files else 0) ^ (56 if flip_ranks else 0)
+        table.append((sq & 7) << 3 | sq >> 3 if mirror else sq)
+    return table
+
+
+# Các phép đối xứng của bàn cờ (bảng ô -> ô): cả 8 phép khi không có tốt, chỉ lật ngang khi có tốt
+SYMMETRIES = [_transform(f, r, m) for m in (False, True) for r in (False, True) for f in (False, True)]
+PAWN_SYMMETRIES = SYMMETRIES[:2]
+
+
+def win(plies):
+    return plies
+
+
+def loss(plies):
+    return -plies - 1
+
+
+def decode_value(value):
+    """Đổi giá trị lưu trong bảng thành (kết quả 1/0/-1, số nửa nước đến chiếu hết)."""
+    if value > 0:
+        return 1, value
+    if value < 0:
+        return -1, -value - 1
+    return 0, 0
+
+
+def _signature(white, black):
+    return 'K' + ''.join(sorted(white, key=ORDER.index)) + 'K' + ''.join(sorted(black, key=ORDER.index))
+
+
+def _strength(letters):
+    return len(letters), sorted((STRENGTH[letter] for letter in letters), reverse=True)
+
+
+def canonical(white, black):
+    """Chữ ký chuẩn của bộ quân (không kể vua) và cờ cho biết có phải đổi màu hay không."""
+    if _strength(white) < _strength(black):
+        return _signature(black, white), True
+    return _signature(white, black), False
+
+
+class Material:
+    """Cách đánh chỉ số các thế cờ của một bộ quân."""
+
+    def __init__(self, signature):
+        self.signature = signature
+        split = signature.index('K', 1)
+        white, black = signature[1:split], signature[split + 1:]
+        # Mã quân theo thứ tự vị trí trong chỉ số: vua trắng, vua đen, quân trắng, quân đen
+        self.codes = [CODE_OF['K'], CODE_OF['k']] + [CODE_OF[p] for p in white] + [CODE_OF[p.lower()] for p in black]
+        self.pawns = 'P' in signature
+        self.kings = HALF if self.pawns else TRIANGLE
+        self.king_index = HALF_INDEX if self.pawns else TRIANGLE_INDEX
+        self.symmetries = PAWN_SYMMETRIES if self.pawns else SYMMETRIES
+        self.others = len(self.codes) - 1
+        self.size = 2 * len(self.kings) * 64 ** self.others
+
+    def normalize(self, locs):
+        """Biến đổi đối xứng để vua trắng nằm trong vùng chuẩn (ô theo chỉ số 0..63)."""
+        if locs[0] & 7 > 3:
+            locs = [sq ^ 7 for sq in locs]  # Lật ngang
+        if not self.pawns:
+            if locs[0] >> 3 > 3:
+                locs = [sq ^ 56 for sq in locs]  # Lật dọc
+            if locs[0] >> 3 > locs[0] & 7:
+                locs = [(sq & 7) << 3 | sq >> 3 for sq in locs]  # Lật qua đường chéo a1-h8
+        return locs
+
+    def index(self, locs, side):
+        locs = self.normalize(locs)
+        idx = side * len(self.kings) + self.king_index[locs[0]]
+        for sq in locs[1:]:
+            idx = idx * 64 + sq
+        return idx
+
+    def decode(self, idx):
+        """Ngược lại với index: trả về (vị trí các quân, bên đi 0/1)."""
+        locs = []
+        for _ in range(self.others):
+            locs.append(idx & 63)
+            idx >>= 6
+        locs.reverse()
+        side, king = divmod(idx, len(self.kings))
+        return [self.kings[king]] + locs, side
+
+    def parents(self, idx):
+        """Chỉ số các thế cờ đi trước có một nước đi thường (không ăn quân, không phong cấp)
+        dẫn tới thế cờ idx, tìm bằng cách đi lùi các quân của bên vừa đi. Thế cờ đi trước phải
+        là dạng chuẩn mà từ đó generate sinh nước đi và rút gọn đối xứng ra đúng idx."""
+        locs, side = self.decode(idx)
+        mover = 0 if side else BLACK  # Bên vừa đi là bên đang đi ở thế cờ trước
+        result = set()
+        seen = set()
+        for table in self.symmetries:
+            image = [table[sq] for sq in locs]
+            key = tuple(image)
+            if key in seen or self.normalize(image) != locs:
+                continue
+            seen.add(key)
+            occupancy = 0
+            for sq in image:
+                occupancy |= 1 << sq
+            for i, code in enumerate(self.codes):
+                if code & BLACK != mover:
+                    continue
+                for sq in _retreats(code, image[i], occupancy):
+                    parent = image[:]
+                    parent[i] = sq
+                    if parent[0] in self.king_index:
+                        result.add(self.index(parent, 1 - side))
+        return result
+
+    def dependencies(self):
+        """Các bộ quân chuẩn có thể đạt được sau một nước ăn quân hoặc phong cấp."""
+        split = self.signature.index('K', 1)
+        white, black = self.signature[1:split], self.signature[split + 1:]
+        result = set()
+        for i in range(len(white)):
+            result.add(canonical(white[:i] + white[i + 1:], black)[0])
+            if white[i] == 'P':
+                for piece in 'QRBN':
+                    result.add(canonical(white[:i] + piece + white[i + 1:], black)[0])
+        for i in range(len(black)):
+            result.add(canonical(white, black[:i] + black[i + 1:])[0])
+            if black[i] == 'P':
+                for piece in 'QRBN':
+                    result.add(canonical(white, black[:i] + piece + black[i + 1:])[0])
+        result.discard('KK')
+        return result
+
+
+def _valid(locs, codes):
+    """Loại các thế cờ không thể có: hai quân cùng ô, hai vua kề nhau, tốt ở hàng 1 hoặc 8."""
+    if len(set(locs)) != len(locs):
+        return False
+    wk, bk = locs[0], locs[1]
+    if abs((wk >> 3) - (bk >> 3)) <= 1 and abs((wk & 7) - (bk & 7)) <= 1:
+        return False
+    for sq, code in zip(locs, codes):
+        if code & 7 == PAWN and sq >> 3 in (0, 7):
+            return False
+    return True
+
+
+def _retreats(code, sq, occupancy):
+    """Các ô (0..63) mà quân code có thể đã đứng trước khi đi thường tới ô sq."""
+    kind = code & 7
+    if kind == PAWN:
+        row = sq >> 3
+        step = 8 if code & BLACK else -8
+        start = 4 if code & BLACK else 3  # Hàng đến sau khi đi hai ô
+        if 1 <= row + step // 8 <= 6 and not occupancy >> (sq + step) & 1:
+            yield sq + step
+            if row == start and not occupancy >> (sq + 2 * step) & 1:
+                yield sq + 2 * step
+        return
+    if kind == KNIGHT:
+        targets = KNIGHT_ATTACKS[sq]
+    elif kind == KING:
+        targets = KING_ATTACKS[sq]
+    else:
+        targets = 0
+        if kind != BISHOP:
+            targets |= sliding_attacks(sq, occupancy, ORTHOGONAL_RAYS)
+        if kind != ROOK:
+            targets |= sliding_attacks(sq, occupancy, DIAGONAL_RAYS)
+    yield from iter_bits(targets & ~occupancy)
+
+
+class Tablebase:
+    """Tập các bảng tàn cuộc đã sinh, nạp lười từ thư mục directory khi cần."""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.tables = {}
+        self.materials = {}  # Material theo chữ ký, dùng lại giữa các lần tra cứu
+
+    def material(self, signature):
+        material = self.materials.get(signature)
+        if material is None:
+            material = self.materials[signature] = Material(signature)
+        return material
+
+    def path(self, signature):
+        return os.path.join(self.directory, signature + '.tb')
+
+    def table(self, signature):
+        """Mảng giá trị của bộ quân, hoặc None nếu chưa có."""
+        values = self.tables.get(signature)
+        if values is None and self.directory and os.path.exists(self.path(signature)):
+            values = array('h')
+            with open(self.path(signature), 'rb') as f:
+                values.frombytes(f.read())
+            if sys.byteorder != 'little':
+                values.byteswap()
+            self.tables[signature] = values
+        return values
+
+    def save(self, signature, values):
+        os.makedirs(self.directory, exist_ok=True)
+        if sys.byteorder != 'little':
+            values = array('h', values)
+            values.byteswap()
+        with open(self.path(signature), 'wb') as f:
+            values.tofile(f)
+
+    def probe_value(self, board):
+        """Giá trị lưu trong bảng cho thế cờ của board (theo bên đang đi), hoặc None nếu
+        thế cờ không thuộc bảng nào đã có."""
+        if board.piece_count > MAX_PIECES:
+            return None
+        squares = board.squares
+        white, black = [], []
+        placed = []
+        for sq in SQUARES:
+            code = squares[sq]
+            if code:
+                placed.append((code, to_64(sq)))
+                if code & 7 != KING:
+                    (black if code & BLACK else white).append('PNBRQK'[(code & 7) - 1])
+        if not white and not black:
+            return DRAW  # Chỉ còn hai vua
+        signature, flipped = canonical(white, black)
+        values = self.table(signature)
+        if values is None:
+            return None
+        side = board.player_turn == 'black'
+        if flipped:
+            # Đổi màu quân và lật bàn cờ theo chiều dọc
+            placed = [(code ^ BLACK, sq ^ 56) for code, sq in placed]
+            side = not side
+        material = self.material(signature)
+        locs = []
+        for code in material.codes:
+            for i, (placed_code, sq) in enumerate(placed):
+                if placed_code == code:
+                    locs.append(sq)
+                    del placed[i]
+                    break
+        return values[material.index(locs, side)]
+
+    def probe(self, board):
+        """Tra cứu thế cờ: (kết quả 1/0/-1 theo bên đang đi, số nửa nước đến chiếu hết),
+        hoặc None nếu không có trong bảng."""
+        value = self.probe_value(board)
+        if value is None or value == ILLEGAL:
+            return None
+        return decode_value(value)
+
+    def generate(self, signature):
+        """Sinh bảng cho một bộ quân bằng phân tích ngược; các bảng phụ thuộc phải có sẵn.
+        Không lưu danh sách cạnh: thế cờ đi trước được tìm lại bằng Material.parents khi cần,
+        nên bộ nhớ chỉ tỉ lệ với số thế cờ (khoảng 8 byte mỗi thế cờ)."""
+        material = self.material(signature)
+        size = material.size
+        codes = material.codes
+        values = array('h', [UNKNOWN]) * size
+        remaining = array('i', [0]) * size  # Số nước đi còn chưa biết là thua cho bên đi
+        longest = array('h', [0]) * size  # Số nửa nước dài nhất trong các nước dẫn tới thua
+        # buckets[n]: các thế cờ được xác định sau n nửa nước; idx nếu thắng, ~idx nếu thua
+        buckets = [array('i')]
+
+        def push(plies, idx, value):
+            while len(buckets) <= plies:
+                buckets.append(array('i'))
+            buckets[plies].append(idx if value > 0 else ~idx)
+
+        board = Board()
+        for idx in range(size):
+            locs, side = material.decode(idx)
+            if not _valid(locs, codes):
+                values[idx] = ILLEGAL
+                continue
+            board._reset()
+            for code, sq in zip(codes, locs):
+                board._put(to_0x88(sq), code)
+            bit = BLACK if side else 0
+            board.player_turn = 'black' if side else 'white'
+            if board._is_attacked(board._kings[(bit ^ BLACK) >> 3], bit):
+                values[idx] = ILLEGAL  # Bên không đi đang bị chiếu
+                continue
+            moves = board._legal_moves(bit)
+            if not moves:
+                if board.king_in_check(board.player_turn):
+                    push(0, idx, loss(0))  # Bị chiếu hết
+                else:
+                    values[idx] = DRAW  # Hết nước đi
+                continue
+
+            children = set()
+            count = 0
+            for frm, to, promotion in moves:
+                captured = board.squares[to]
+                board._make(frm, to, promotion)
+                if captured or promotion:
+                    child = self.probe_value(board)
+                    if child is None:
+                        raise ValueError(f'missing table for a successor of {signature}')
+                    if child < 0:
+                        push(-child, idx, win(-child))  # Đối phương thua sau -child - 1 nửa nước
+                    elif child > 0:
+                        longest[idx] = max(longest[idx], child)
+                    else:
+                        count += 1  # Nước dẫn tới hòa: thế cờ này không thể thua
+                else:
+                    children.add(material.index([to_64(to) if sq == to_64(frm) else sq for sq in locs], 1 - side))
+                board._unmake()
+            remaining[idx] = count + len(children)
+            if not remaining[idx]:
+                push(longest[idx] + 1, idx, loss(longest[idx] + 1))
+
+        # Lan ngược theo số nửa nước tăng dần nên giá trị đầu tiên gán cho mỗi thế cờ là ngắn nhất
+        plies = 0
+        while plies < len(buckets):
+            for idx in buckets[plies]:
+                value = win(plies) if idx >= 0 else loss(plies)
+                idx = idx if idx >= 0 else ~idx
+                if values[idx] != UNKNOWN:
+                    continue
+                values[idx] = value
+                for parent in material.parents(idx):
+                    if values[parent] != UNKNOWN:
+                        continue
+                    if value < 0:
+                        push(plies + 1, parent, win(plies + 1))
+                    else:
+                        remaining[parent] -= 1
+                        longest[parent] = max(longest[parent], plies)
+                        if not remaining[parent]:
+                            push(longest[parent] + 1, parent, loss(longest[parent] + 1))
+            buckets[plies] = None
+            plies += 1
+
+        for idx in range(size):
+            if values[idx] == UNKNOWN:
+                values[idx] = DRAW  # Không bên nào ép được chiếu hết
+        self.tables[signature] = values
+        return values
+
+
+def generation_levels(signatures):
+    """Nhóm các bộ quân (kể cả các bảng phụ thuộc) thành từng tầng; các bộ trong cùng
+    một tầng không phụ thuộc nhau nên sinh song song được."""
+    levels = {}
+
+    def level(signature):
+        if signature not in levels:
+            deps = Material(signature).dependencies()
+            levels[signature] = 1 + max((level(dep) for dep in deps), default=-1)
+        return levels[signature]
+
+    for signature in signatures:
+        level(canonical(*_split(signature))[0])
+    grouped = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+    for signature, n in sorted(levels.items()):
+        grouped[n].append(signature)
+    return grouped
+
+
+def _split(signature):
+    split = signature.index('K', 1)
+    return signature[1:split], signature[split + 1:]
+
+
+def _generate_file(directory, signature):
+    tablebase = Tablebase(directory)
+    tablebase.save(signature, tablebase.generate(signature))
+    return signature
+
+
+def generate_all(signatures, directory, workers=None):
+    """Sinh các bảng (và bảng phụ thuộc) còn thiếu trong directory, song song theo tầng."""
+    tablebase = Tablebase(directory)
+    done = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for group in generation_levels(signatures):
+            todo = [sig for sig in group if not os.path.exists(tablebase.path(sig))]
+            done += executor.map(_generate_file, [directory] * len(todo), todo)
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate or probe endgame tablebases.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    gen = commands.add_parser('generate', help='generate tables for material signatures')
+    gen.add_argument('signatures', nargs='+', help='e.g. KQK KRK KPK KRKP')
+    gen.add_argument('--dir', default='tables')
+    gen.add_argument('--workers', type=int)
+    probe = commands.add_parser('probe', help='probe a position')
+    probe.add_argument('fen')
+    probe.add_argument('--dir', default='tables')
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        for signature in generate_all([s.upper() for s in args.signatures], args.dir, args.workers):
+            print(f'generated {signature}')
+    else:
+        result = Tablebase(args.dir).probe(Board(args.fen))
+        if result is None:
+            print('not in tablebase')
+        else:
+            wdl, plies = result
+            print({1: 'win', 0: 'draw', -1: 'loss'}[wdl] + (f' in {plies} plies' if wdl else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
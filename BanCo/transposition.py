@@ -0,0 +1,55 @@
+# Bảng chuyển vị: bộ nhớ đệm kích thước cố định cho kết quả theo từng thế cờ,
+# khóa là Zobrist key của bàn cờ (Board.zobrist_key).
+
+# Loại giá trị lưu trong bảng (dùng cho tìm kiếm alpha-beta)
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    """Bảng băm có số ô cố định; mỗi ô giữ một mục
+    (khóa, độ sâu, giá trị, loại, nước đi, thế hệ)."""
+
+    def __init__(self, size=1 << 16):
+        size = 1 << max(size - 1, 1).bit_length()  # Làm tròn lên lũy thừa của 2
+        self.mask = size - 1
+        self.slots = [None] * size
+        self.generation = 0  # Tăng sau mỗi lần tìm kiếm mới để các mục cũ dễ bị thay
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        """Trả về mục ứng với key, hoặc None nếu không có."""
+        self.probes += 1
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, value, flag=EXACT, move=None):
+        """Lưu kết quả cho key. Mục đang có chỉ bị thay khi cùng thế cờ, thuộc thế hệ cũ
+        hoặc được tính ở độ sâu không lớn hơn."""
+        index = key & self.mask
+        old = self.slots[index]
+        if old is None or old[0] == key or old[5] != self.generation or depth >= old[1]:
+            self.slots[index] = (key, depth, value, flag, move, self.generation)
+
+    def get(self, key, default=None):
+        """Lấy giá trị đã lưu cho key (dùng như một bộ nhớ đệm thông thường)."""
+        entry = self.probe(key)
+        return entry[2] if entry is not None else default
+
+    def new_search(self):
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * (self.mask + 1)
+        self.generation = 0
+        self.probes = self.hits = 0
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
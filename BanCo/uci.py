@@ -0,0 +1,248 @@
+# Giao tiếp UCI qua stdin/stdout để chạy máy cờ không cần giao diện đồ họa (máy chủ không
+# có màn hình, các chương trình giao diện cờ và bộ chạy giải đấu chuẩn).
+#
+# Cả phiên chỉ dùng một Board. Lệnh "position" được áp dụng tăng dần: nếu thế cờ gốc giống
+# lần trước và danh sách nước đi mới nối tiếp danh sách cũ, chỉ các nước mới được đi thêm
+# (hoặc hoàn tác bớt nếu danh sách ngắn lại), không phân tích lại FEN.
+#
+#   python uci.py
+import sys
+import threading
+
+from chessboard import Board
+from pgn import STANDARD_START
+from search import MATE, MAX_PLY, Searcher
+from transposition import TranspositionTable
+
+ENGINE_NAME = 'BanCo'
+DEFAULT_HASH_ENTRIES = 1 << 18
+# Các tham số của lệnh go có một giá trị số đi kèm; ponder, infinite đứng một mình, searchmoves
+# kèm một danh sách nước đi đến từ khóa tiếp theo
+GO_VALUES = ('wtime', 'btime', 'winc', 'binc', 'movestogo', 'depth', 'nodes', 'mate', 'movetime')
+GO_FLAGS = ('ponder', 'infinite')
+
+
+def parse_move(text):
+    """Chuyển nước đi UCI ('e2e4', 'e7e8q') thành ('E2', 'E4') hoặc ('E7', 'E8', 'Q')."""
+    return (text[0:2].upper(), text[2:4].upper()) + ((text[4].upper(),) if len(text) > 4 else ())
+
+
+def format_move(move):
+    """Chuyển ('E2', 'E4') hoặc ('E7', 'E8', 'Q') thành nước đi UCI 'e2e4', 'e7e8q'."""
+    return ''.join(move).lower()
+
+
+def parse_go(args):
+    """Phân tích các tham số của lệnh go theo thứ tự: {'depth': 5, 'infinite': True,
+    'searchmoves': ['e2e4', ...], ...}. ValueError nếu giá trị không phải số."""
+    options, i = {}, 0
+    while i < len(args):
+        token = args[i]
+        i += 1
+        if token in GO_FLAGS:
+            options[token] = True
+        elif token == 'searchmoves':
+            moves = []
+            while i < len(args) and args[i] not in GO_VALUES + GO_FLAGS:
+                moves.append(args[i])
+                i += 1
+            options[token] = moves
+        elif token in GO_VALUES and i < len(args):
+            options[token] = int(args[i])
+            i += 1
+    return options
+
+
+def format_score(score):
+    """Điểm UCI: 'cp n' hoặc 'mate n' (n là số nước đầy đủ, âm nếu bị chiếu hết)."""
+    if abs(score) >= MATE - MAX_PLY:
+        plies = MATE - abs(score)
+        return f'mate {(plies + 1) // 2 if score > 0 else -(plies // 2)}'
+    return f'cp {score}'
+
+
+class UCIServer:
+    """Xử lý từng dòng lệnh UCI; việc tìm kiếm chạy trên một luồng riêng để vẫn nhận được
+    các lệnh stop, isready trong khi máy cờ đang tính."""
+
+    def __init__(self, board=None, out=sys.stdout):
+        self.board = board if board is not None else Board()
+        self.out = out
+        self.tt = TranspositionTable(DEFAULT_HASH_ENTRIES)
+        self.base = None  # FEN của thế cờ gốc trong lệnh position gần nhất
+        self.moves = []  # Các nước (dạng UCI) đã đi từ thế cờ gốc
+        self._lock = threading.Lock()  # Luồng tìm kiếm và luồng chính cùng ghi ra out
+        self._stop = threading.Event()
+        self._release = threading.Event()  # Cho phép gửi bestmove; chờ stop/ponderhit khi go infinite/ponder
+        self._ponder_time = None  # Thời gian tìm (giây) áp dụng khi nhận ponderhit
+        self._timer = None
+        self._thread = None
+
+    def send(self, line):
+        with self._lock:
+            self.out.write(line + '\n')
+            self.out.flush()
+
+    def run(self, stream=sys.stdin):
+        for line in stream:
+            if not self.handle(line):
+                break
+        self.stop()
+
+    def handle(self, line):
+        """Xử lý một dòng lệnh; trả về False khi nhận lệnh quit. Lệnh hỏng chỉ được báo lại
+        bằng info string, máy cờ vẫn tiếp tục chạy."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        try:
+            return self.dispatch(tokens[0], tokens[1:])
+        except Exception as exc:
+            self.send(f'info string error {type(exc).__name__}: {exc}')
+            return True
+
+    def dispatch(self, command, args):
+        if command == 'uci':
+            self.send(f'id name {ENGINE_NAME}')
+            self.send('id author BanCo')
+            self.send(f'option name Hash type spin default {DEFAULT_HASH_ENTRIES >> 15} min 1 max 1024')
+            self.send('uciok')
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'ucinewgame':
+            self.stop()
+            self.tt.clear()
+            self.base = None
+        elif command == 'setoption':
+            self.set_option(args)
+        elif command == 'position':
+            self.stop()
+            self.set_position(args)
+        elif command == 'go':
+            self.stop()
+            self.go(args)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'ponderhit':
+            self.ponderhit()
+        elif command == 'quit':
+            return False
+        else:
+            self.send(f'info string unknown command {command}')
+        return True
+
+    def set_option(self, args):
+        # setoption name Hash value <MB>: mỗi mục bảng chuyển vị tính khoảng 32 byte
+        if len(args) >= 4 and args[0] == 'name' and args[1].lower() == 'hash' and args[2] == 'value':
+            self.stop()
+            self.tt = TranspositionTable(max(1, int(args[3])) << 15)
+
+    def set_position(self, args):
+        if 'moves' in args:
+            split = args.index('moves')
+            spec, moves = args[:split], args[split + 1:]
+        else:
+            spec, moves = args, []
+        if spec and spec[0] == 'fen':
+            base = ' '.join(spec[1:])
+        else:
+            base = STANDARD_START
+
+        board = self.board
+        if base == self.base and self.moves == moves[:len(self.moves)]:
+            new_moves = moves[len(self.moves):]  # Chỉ đi thêm các nước mới
+        elif base == self.base and moves == self.moves[:len(moves)]:
+            for _ in range(len(self.moves) - len(moves)):  # Danh sách ngắn lại: hoàn tác bớt
+                board.unmake_move()
+            self.moves = moves
+            return
+        else:
+            Board(base)  # Phân tích trên bàn cờ nháp trước: FEN hỏng không làm mất thế cờ đang có
+            board.show(base)
+            self.base, self.moves, new_moves = base, [], moves
+
+        for text in new_moves:
+            move = parse_move(text)
+            if not board.is_legal(move[0], move[1]):
+                self.send(f'info string illegal move {text}')
+                break
+            board.make_move(*move)
+            self.moves.append(text)
+
+    def go(self, args):
+        options = parse_go(args)
+        depth = options.get('depth', MAX_PLY)
+        nodes = options.get('nodes')
+        movetime = options['movetime'] / 1000 if 'movetime' in options else None
+        side = 'w' if self.board.player_turn == 'white' else 'b'
+        if movetime is None and f'{side}time' in options:
+            # Chia thời gian còn lại cho số nước còn phải đi (mặc định 30) và cộng nửa số giây cộng thêm
+            remaining = options[f'{side}time'] / 1000
+            increment = options.get(f'{side}inc', 0) / 1000
+            movestogo = max(1, options.get('movestogo', 30))
+            movetime = max(0.01, min(remaining / movestogo + increment / 2, remaining / 2))
+        # Chỉ giữ các nước hợp lệ trong searchmoves; danh sách rỗng nghĩa là xét mọi nước
+        moves = [move for move in map(parse_move, options.get('searchmoves', ()))
+                 if self.board.is_legal(move[0], move[1])]
+
+        self._stop.clear()
+        self._ponder_time = None
+        if options.get('infinite') or options.get('ponder'):
+            # Tìm không giới hạn và giữ bestmove đến khi có stop (hoặc ponderhit khi đang ponder)
+            if options.get('ponder'):
+                self._ponder_time = movetime
+            if options.get('infinite'):
+                depth, nodes = MAX_PLY, None
+            movetime = None
+            self._release.clear()
+        else:
+            self._release.set()
+        self._thread = threading.Thread(target=self._search, args=(depth, movetime, nodes, moves), daemon=True)
+        self._thread.start()
+
+    def _search(self, depth, movetime, nodes, moves):
+        searcher = Searcher(self.board, tt=self.tt)
+        found = searcher.search(depth=depth, movetime=movetime, nodes=nodes,
+                                stop_event=self._stop, callback=self._info, moves=moves)
+        self._release.wait()
+        if found.move is not None:
+            self.send(f'bestmove {format_move(found.move)}')
+        else:
+            self.send('bestmove 0000')  # Không còn nước đi hợp lệ
+
+    def _info(self, result):
+        nps = int(result.nodes / result.seconds) if result.seconds else 0
+        pv = ' '.join(format_move(move) for move in result.pv)
+        self.send(f'info depth {result.depth} score {format_score(result.score)} nodes {result.nodes} '
+                  f'nps {nps} time {int(result.seconds * 1000)} pv {pv}')
+
+    def ponderhit(self):
+        """Đối phương đã đi đúng nước được đoán: tính giờ cho phần tìm kiếm còn lại và cho phép
+        gửi bestmove khi tìm xong."""
+        if self._thread is None:
+            return
+        if self._ponder_time is not None:
+            self._timer = threading.Timer(self._ponder_time, self._stop.set)
+            self._timer.daemon = True
+            self._timer.start()
+        self._release.set()
+
+    def stop(self):
+        """Dừng tìm kiếm đang chạy (nếu có) và chờ luồng tìm kiếm gửi bestmove."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._thread is not None:
+            self._stop.set()
+            self._release.set()
+            self._thread.join()
+            self._thread = None
+
+
+def main(argv=None):
+    UCIServer().run(sys.stdin)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
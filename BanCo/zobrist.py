@@ -0,0 +1,17 @@
+# Khóa Zobrist: mỗi (mã quân cờ, ô) có một số ngẫu nhiên 64 bit, khóa của thế cờ là
+# XOR của các số ứng với từng quân trên bàn cùng với lượt đi, quyền nhập thành và
+# cột bắt tốt qua đường. Dùng seed cố định để khóa giống nhau giữa các tiến trình
+# và giữa các lần chạy (cần cho các tệp lưu trữ theo khóa).
+import random
+
+_rng = random.Random(0x5EED1DEA)
+
+# PIECE_KEYS[mã quân][chỉ số 0x88]; mã 0 (ô trống) toàn số 0 để khỏi phải rẽ nhánh
+PIECE_KEYS = [[0] * 128 for _ in range(16)]
+for _code in (1, 2, 3, 4, 5, 6, 9, 10, 11, 12, 13, 14):
+    PIECE_KEYS[_code] = [_rng.getrandbits(64) for _ in range(128)]
+del _code
+
+SIDE_KEY = _rng.getrandbits(64)  # XOR vào khi đến lượt bên đen
+CASTLING_KEYS = [0] + [_rng.getrandbits(64) for _ in range(15)]  # Theo 4 bit quyền nhập thành
+EN_PASSANT_KEYS = [_rng.getrandbits(64) for _ in range(8)]  # Theo cột của ô bắt tốt qua đường